@@ -0,0 +1,135 @@
+// Aggregation worker for app.js: used when there is no precomputed summary
+// (data/summary.json) and the dashboard has to aggregate the history itself.
+//
+// 'load' turns the rows into typed columns once, with prefix sums for every
+// count and composition bucket, and a sparse table for the peak day. After
+// that, any window's KPIs come from a few array lookups. 'window' replies with
+// the KPIs, the composition and the (decimated) chart rows, so the main thread
+// only paints.
+const FIELDS = ['aircraft_total', 'aircraft_crossing', 'vessels_total', 'official_ships_total', 'balloons_total'];
+const BUCKETS = ['主戰機', '輔戰機', '無人機', '直升機'];
+const MAX_POINTS = 400;
+
+let cols = null;
+
+// Same buckets (first match wins) as renderCompositionChart / rollups.py
+function bucketOf(type) {
+    type = (type || '').toLowerCase();
+    if (type.includes('fighter') || type.includes('主戰')) return 0;
+    if (type.includes('support') || type.includes('輔戰')) return 1;
+    if (type.includes('uav') || type.includes('無人')) return 2;
+    if (type.includes('heli') || type.includes('直升')) return 3;
+    return -1;
+}
+
+function build(rows) {
+    const n = rows.length;
+    const dates = rows.map(r => r.activity_date);
+    const counts = {};
+    const prefix = {};
+    FIELDS.forEach(f => {
+        const values = new Int32Array(n);
+        const sums = new Float64Array(n + 1);
+        for (let i = 0; i < n; i++) {
+            values[i] = rows[i][f] || 0;
+            sums[i + 1] = sums[i] + values[i];
+        }
+        counts[f] = values;
+        prefix[f] = sums;
+    });
+
+    // Composition prefix sums: one per bucket plus all sorties (last)
+    const comp = Array.from({ length: BUCKETS.length + 1 }, () => new Float64Array(n + 1));
+    const day = new Float64Array(BUCKETS.length + 1);
+    for (let i = 0; i < n; i++) {
+        day.fill(0);
+        const r = rows[i];
+        if (r.composition) {
+            for (let b = 0; b <= BUCKETS.length; b++) day[b] = r.composition[b] || 0;
+        } else if (r.pla_flight_events) {
+            r.pla_flight_events.forEach(e => {
+                const c = e.count || 0;
+                const b = bucketOf(e.aircraft_type);
+                if (b >= 0) day[b] += c;
+                day[BUCKETS.length] += c;
+            });
+        }
+        for (let b = 0; b <= BUCKETS.length; b++) comp[b][i + 1] = comp[b][i] + day[b];
+    }
+
+    // Sparse table of argmax(aircraft_total); ties go to the earlier day, as in renderKPIs
+    const air = counts.aircraft_total;
+    const levels = [new Int32Array(n).map((_, i) => i)];
+    for (let k = 1; (1 << k) <= n; k++) {
+        const prev = levels[k - 1];
+        const half = 1 << (k - 1);
+        const level = new Int32Array(n - (1 << k) + 1);
+        for (let i = 0; i < level.length; i++) {
+            const a = prev[i], b = prev[i + half];
+            level[i] = air[b] > air[a] ? b : a;
+        }
+        levels.push(level);
+    }
+
+    cols = { n, dates, counts, prefix, comp, levels };
+}
+
+function peak(lo, hi) {
+    if (hi <= lo) return -1;
+    const k = 31 - Math.clz32(hi - lo);
+    const a = cols.levels[k][lo], b = cols.levels[k][hi - (1 << k)];
+    const air = cols.counts.aircraft_total;
+    if (air[a] !== air[b]) return air[a] > air[b] ? a : b;
+    return Math.min(a, b);
+}
+
+function chartRows(lo, hi, key) {
+    // Bucket peaks of `key`, at most MAX_POINTS rows
+    const size = Math.max(1, Math.ceil((hi - lo) / MAX_POINTS));
+    const values = cols.counts[key];
+    const out = [];
+    for (let start = lo; start < hi; start += size) {
+        let best = start;
+        for (let i = start + 1; i < Math.min(start + size, hi); i++) {
+            if (values[i] > values[best]) best = i;
+        }
+        const row = { activity_date: cols.dates[best] };
+        FIELDS.forEach(f => { row[f] = cols.counts[f][best]; });
+        out.push(row);
+    }
+    return out;
+}
+
+function aggregate(days) {
+    // A window is the last N recorded days (0 = all), as in updateDashboard
+    const hi = cols.n;
+    const lo = days > 0 ? Math.max(0, hi - days) : 0;
+    const kpis = {};
+    FIELDS.forEach(f => { kpis[f] = cols.prefix[f][hi] - cols.prefix[f][lo]; });
+    const top = peak(lo, hi);
+    const topValue = top >= 0 ? cols.counts.aircraft_total[top] : 0;
+    kpis.max_day = topValue;
+    kpis.max_date = topValue > 0 ? cols.dates[top] : '';
+
+    const composition = {};
+    BUCKETS.forEach((name, b) => { composition[name] = cols.comp[b][hi] - cols.comp[b][lo]; });
+    const compositionTotal = cols.comp[BUCKETS.length][hi] - cols.comp[BUCKETS.length][lo];
+
+    return {
+        kpis,
+        composition,
+        composition_total: compositionTotal,
+        trend: chartRows(lo, hi, 'aircraft_total'),
+        official: chartRows(lo, hi, 'official_ships_total'),
+        balloons: chartRows(lo, hi, 'balloons_total')
+    };
+}
+
+self.onmessage = e => {
+    const msg = e.data;
+    if (msg.type === 'load') {
+        build(msg.rows);
+    } else if (msg.type === 'window') {
+        self.postMessage(Object.assign({ id: msg.id, days: msg.days }, cols ? aggregate(msg.days) : { error: 'no data' }));
+    }
+};
@@ -0,0 +1,242 @@
+import os
+import sys
+import json
+import sqlite3
+import bisect
+import threading
+from array import array
+from datetime import date, timedelta
+import supabase_api
+from jsonl_io import read_records
+
+# Local copy of pla_activity / pla_flight_events for offline analysis.
+#
+# Rows live in SQLite (same columns as the Supabase tables, plus `day`, the
+# date as a proleptic ordinal). Queries run on a column snapshot: one typed
+# array per count, sorted by day, with prefix sums so any date-range total or
+# rolling window is two bisects and a subtraction. The snapshot is rebuilt only
+# when the store's revision changes.
+#
+#   python analytics_store.py [merged_pla_data.jsonl]   # (re)load history and print a summary
+STORE_FILE = os.environ.get("ANALYTICS_STORE_FILE", "pla_analytics.sqlite")
+
+COUNT_FIELDS = ("aircraft_total", "aircraft_crossing", "vessels_total", "official_ships_total", "balloons_total")
+
+_local = threading.local()
+_snapshot_lock = threading.Lock()
+_snapshot = None
+
+
+def _connect():
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(STORE_FILE, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS pla_activity (
+                activity_date TEXT PRIMARY KEY,
+                day INTEGER NOT NULL,
+                publish_date TEXT,
+                link TEXT,
+                aircraft_total INTEGER DEFAULT 0,
+                aircraft_crossing INTEGER DEFAULT 0,
+                vessels_total INTEGER DEFAULT 0,
+                official_ships_total INTEGER DEFAULT 0,
+                balloons_total INTEGER DEFAULT 0,
+                original_text TEXT,
+                image_file TEXT
+            );
+            CREATE TABLE IF NOT EXISTS pla_flight_events (
+                activity_date TEXT NOT NULL,
+                day INTEGER NOT NULL,
+                time_range TEXT,
+                aircraft_type TEXT,
+                count INTEGER DEFAULT 0,
+                details TEXT
+            );
+            CREATE INDEX IF NOT EXISTS pla_flight_events_day ON pla_flight_events (day);
+            CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value INTEGER);
+        """)
+        _local.conn = conn
+    return conn
+
+
+def to_day(date_str):
+    return date.fromisoformat(date_str).toordinal()
+
+
+def from_day(day):
+    return date.fromordinal(day).isoformat()
+
+
+def revision():
+    row = _connect().execute("SELECT value FROM store_meta WHERE key='revision'").fetchone()
+    return row[0] if row else 0
+
+
+def upsert(records):
+    """Stores merged records (activity row + events) by activity_date, replacing existing days. Returns the count."""
+    # Later duplicates of a date win, as in supabase_api.upsert_batch
+    by_date = {record['activity_date']: record for record in records if record.get('activity_date')}
+    activity, events, dates = [], [], []
+    for record in by_date.values():
+        row = supabase_api.activity_row(record)
+        day = to_day(row['activity_date'])
+        dates.append((row['activity_date'],))
+        activity.append((row['activity_date'], day, row['publish_date'], row['link'],
+                         *(int(row[field] or 0) for field in COUNT_FIELDS), row['original_text'], row['image_file']))
+        events.extend((row['activity_date'], day, evt['time_range'], evt['aircraft_type'], int(evt['count'] or 0),
+                       json.dumps(evt['details'], ensure_ascii=False)) for evt in supabase_api.event_rows(record, None))
+    if not activity:
+        return 0
+
+    conn = _connect()
+    with conn:
+        conn.executemany("INSERT OR REPLACE INTO pla_activity VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", activity)
+        conn.executemany("DELETE FROM pla_flight_events WHERE activity_date=?", dates)
+        conn.executemany("INSERT INTO pla_flight_events VALUES (?, ?, ?, ?, ?, ?)", events)
+        conn.execute("INSERT INTO store_meta VALUES ('revision', 1) "
+                     "ON CONFLICT(key) DO UPDATE SET value = value + 1")
+    return len(activity)
+
+
+class Columns:
+    """
+    Column snapshot of pla_activity: `day` (int32 ordinals, ascending) and one
+    int32 array per count field, plus int64 prefix sums (`prefix[field][i]` is
+    the total of the first i days).
+    """
+
+    def __init__(self, rows):
+        self.day = array('i', (row[0] for row in rows))
+        self.counts = {}
+        self.prefix = {}
+        for offset, field in enumerate(COUNT_FIELDS, 1):
+            values = array('i', (row[offset] for row in rows))
+            running = array('q', [0])
+            total = 0
+            for value in values:
+                total += value
+                running.append(total)
+            self.counts[field] = values
+            self.prefix[field] = running
+
+    def __len__(self):
+        return len(self.day)
+
+    def span(self, start=None, end=None):
+        """Index range [lo, hi) of the days between start and end (ISO dates, inclusive)."""
+        lo = bisect.bisect_left(self.day, to_day(start)) if start else 0
+        hi = bisect.bisect_right(self.day, to_day(end)) if end else len(self.day)
+        return lo, max(lo, hi)
+
+
+def columns():
+    """Returns the current Columns snapshot, rebuilding it only if the store changed."""
+    global _snapshot
+    current = revision()
+    with _snapshot_lock:
+        if _snapshot is None or _snapshot[0] != current:
+            rows = _connect().execute(
+                f"SELECT day, {', '.join(COUNT_FIELDS)} FROM pla_activity ORDER BY day").fetchall()
+            _snapshot = (current, Columns(rows))
+        return _snapshot[1]
+
+
+# --- Query API ---
+def date_bounds():
+    cols = columns()
+    if not len(cols):
+        return None, None
+    return from_day(cols.day[0]), from_day(cols.day[-1])
+
+
+def total(field, start=None, end=None):
+    """Sum of a count field over the days between start and end (inclusive)."""
+    cols = columns()
+    lo, hi = cols.span(start, end)
+    return cols.prefix[field][hi] - cols.prefix[field][lo]
+
+
+def series(field, start=None, end=None):
+    """[(date, value)] for the recorded days between start and end."""
+    cols = columns()
+    lo, hi = cols.span(start, end)
+    return [(from_day(day), value) for day, value in zip(cols.day[lo:hi], cols.counts[field][lo:hi])]
+
+
+def rolling(field, window_days, start=None, end=None):
+    """[(date, sum over the calendar window ending that day)] for each recorded day between start and end."""
+    cols = columns()
+    lo, hi = cols.span(start, end)
+    prefix = cols.prefix[field]
+    result = []
+    for i in range(lo, hi):
+        first = bisect.bisect_left(cols.day, cols.day[i] - window_days + 1)
+        result.append((from_day(cols.day[i]), prefix[i + 1] - prefix[first]))
+    return result
+
+
+def monthly(field, start=None, end=None):
+    """{"YYYY-MM": total} between start and end."""
+    cols = columns()
+    lo, hi = cols.span(start, end)
+    result = {}
+    for day, value in zip(cols.day[lo:hi], cols.counts[field][lo:hi]):
+        month = from_day(day)[:7]
+        result[month] = result.get(month, 0) + value
+    return result
+
+
+def events_for(date_str):
+    """The flight events recorded for one activity date."""
+    rows = _connect().execute(
+        "SELECT time_range, aircraft_type, count, details FROM pla_flight_events WHERE day=? ORDER BY rowid",
+        (to_day(date_str),)).fetchall()
+    return [{"time": t, "aircraft_type": a, "count": c, "details": json.loads(d or '[]')} for t, a, c, d in rows]
+
+
+def event_counts(start=None):
+    """[(aircraft_type, count)] for every flight event on or after start."""
+    day = to_day(start) if start else 0
+    return _connect().execute("SELECT aircraft_type, count FROM pla_flight_events WHERE day >= ?", (day,)).fetchall()
+
+
+ACTIVITY_COLUMNS = ("activity_date", "publish_date", "link") + COUNT_FIELDS + ("original_text", "image_file")
+
+
+def activity_rows(start=None):
+    """pla_activity rows on or after start, oldest first, each with its pla_flight_events (the dashboard's shape)."""
+    day = to_day(start) if start else 0
+    conn = _connect()
+    events = {}
+    for activity_date, time_range, aircraft_type, count, details in conn.execute(
+            "SELECT activity_date, time_range, aircraft_type, count, details FROM pla_flight_events "
+            "WHERE day >= ? ORDER BY rowid", (day,)):
+        events.setdefault(activity_date, []).append({"activity_date": activity_date, "time_range": time_range,
+                                                     "aircraft_type": aircraft_type, "count": count,
+                                                     "details": json.loads(details or '[]')})
+    rows = conn.execute(f"SELECT {', '.join(ACTIVITY_COLUMNS)} FROM pla_activity WHERE day >= ? ORDER BY day", (day,))
+    for values in rows:
+        row = dict(zip(ACTIVITY_COLUMNS, values))
+        row["pla_flight_events"] = events.get(row["activity_date"], [])
+        yield row
+
+
+def main():
+    source = sys.argv[1] if len(sys.argv) > 1 else 'merged_pla_data.jsonl'
+    try:
+        count = upsert(read_records(source))
+    except FileNotFoundError:
+        print(f"{source} not found.")
+        return
+    first, last = date_bounds()
+    print(f"Loaded {count} days from {source}. Store covers {first} .. {last} ({len(columns())} days).")
+    if last:
+        year_ago = (date.fromisoformat(last) - timedelta(days=364)).isoformat()
+        for field in COUNT_FIELDS:
+            print(f"  {field}: {total(field)} total, {total(field, year_ago, last)} in the last 365 days")
+
+
+if __name__ == "__main__":
+    main()
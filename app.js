@@ -1,32 +1,221 @@
 // Global Data Store
 let GLOBAL_DATA = [];
+let DAY_INDEX = {};     // activity_date -> full record (once the history has loaded)
+let SUMMARY = null;     // Precomputed KPIs/rollups (data/summary.json, written by rollups.py)
+let CURRENT_WINDOW = 0;
+const TABLE_ROWS = 100;   // rows loaded before the log table first paints
 let CURRENT_CHART_DATA = [];
 let trendChartInstance = null;
 let compositionChartInstance = null;
 let officialChartInstance = null;
 let balloonsChartInstance = null;
 
-async function init() {
+function showVersion(latestDate) {
+    document.getElementById('nav-ver').innerText = latestDate;
+    document.getElementById('ver-date').innerText = latestDate;
+    document.getElementById('startup-modal').classList.remove('hidden');
+}
+
+async function loadSummary() {
+    // A few KB of precomputed aggregates: enough for KPIs and charts on first paint
     try {
-        const res = await fetch(`${CONFIG.SUPABASE_URL}/rest/v1/pla_activity?select=*,pla_flight_events(*)&order=activity_date.asc`, {
-            headers: {
-                "apikey": CONFIG.SUPABASE_KEY,
-                "Authorization": `Bearer ${CONFIG.SUPABASE_KEY}`
-            }
+        const res = await fetch('data/summary.json', { cache: 'no-cache' });
+        if (!res.ok) return null;
+        return await res.json();
+    } catch (e) {
+        console.warn('Summary unavailable, computing from the full history', e);
+        return null;
+    }
+}
+
+// --- Static snapshots (data/manifest.json, written by snapshots.py) ---
+let MANIFEST = null;
+const LOADED_SHARDS = {};   // shard name -> rows
+
+async function loadManifest() {
+    try {
+        const res = await fetch('data/manifest.json', { cache: 'no-cache' });
+        if (!res.ok) return null;
+        return await res.json();
+    } catch (e) {
+        return null;
+    }
+}
+
+async function loadShards(shards) {
+    // Shard names are content-hashed, so the browser/CDN may cache them indefinitely
+    await Promise.all(shards.filter(s => !LOADED_SHARDS[s.name]).map(async s => {
+        const res = await fetch(`data/${s.file}`);
+        if (!res.ok) throw new Error(`Snapshot ${s.name} unavailable`);
+        LOADED_SHARDS[s.name] = await res.json();
+    }));
+    const rows = [];
+    MANIFEST.shards.forEach(s => { if (LOADED_SHARDS[s.name]) rows.push(...LOADED_SHARDS[s.name]); });
+    setData(rows);
+}
+
+async function loadMoreHistory() {
+    // Next older block of rows: a snapshot shard (newest first) or a live feed page
+    if (MANIFEST && MANIFEST.shards.length) {
+        const next = [...MANIFEST.shards].reverse().find(s => !LOADED_SHARDS[s.name]);
+        if (!next) return false;
+        await loadShards([next]);
+        return true;
+    }
+    return fetchLivePage();
+}
+
+async function ensureRows(minRows) {
+    while (GLOBAL_DATA.length < minRows && await loadMoreHistory());
+}
+
+// --- Live Supabase feed (when no snapshots are published) ---
+const API_HEADERS = {
+    "apikey": CONFIG.SUPABASE_KEY,
+    "Authorization": `Bearer ${CONFIG.SUPABASE_KEY}`
+};
+const FEED_COLUMNS = 'activity_date,publish_date,link,aircraft_total,aircraft_crossing,vessels_total,official_ships_total,balloons_total,image_file';
+const FEED_PAGE = 500;
+
+let LIVE_ROWS = [];     // newest first
+let LIVE_DONE = false;
+
+async function fetchLivePage() {
+    // Keyset pagination, newest first: each page continues below the last activity_date
+    // seen, so every request is an index range scan however long the history gets.
+    // Without a summary the composition chart needs the event types and counts too.
+    if (LIVE_DONE) return false;
+    const select = SUMMARY ? FEED_COLUMNS : `${FEED_COLUMNS},pla_flight_events(aircraft_type,count)`;
+    const keyset = LIVE_ROWS.length ? `&activity_date=lt.${LIVE_ROWS[LIVE_ROWS.length - 1].activity_date}` : '';
+    const res = await fetch(`${CONFIG.SUPABASE_URL}/rest/v1/pla_activity?select=${select}&order=activity_date.desc&limit=${FEED_PAGE}${keyset}`, {
+        headers: API_HEADERS
+    });
+    if (!res.ok) throw new Error("API Error");
+    const page = await res.json();
+    LIVE_ROWS.push(...page);
+    if (page.length < FEED_PAGE) LIVE_DONE = true;
+    setData([...LIVE_ROWS].reverse());
+    return page.length > 0;
+}
+
+async function fetchLiveHistory() {
+    // Restart from the newest day (the select may have changed) and read every page
+    LIVE_ROWS = [];
+    LIVE_DONE = false;
+    while (await fetchLivePage());
+}
+
+// --- Per-day detail (original text + flight events), loaded when a day is opened ---
+const DETAIL_CACHE = {};        // activity_date -> Promise<{original_text, events}>
+const EVENT_SHARD_CACHE = {};   // month -> Promise<{activity_date: detail}>
+
+function loadEventShard(month) {
+    const shard = MANIFEST && (MANIFEST.events || []).find(s => s.name === month);
+    if (!shard) return Promise.resolve({});
+    if (!EVENT_SHARD_CACHE[month]) {
+        EVENT_SHARD_CACHE[month] = fetch(`data/${shard.file}`).then(res => {
+            if (!res.ok) throw new Error(`Event shard ${month} unavailable`);
+            return res.json();
         });
+        EVENT_SHARD_CACHE[month].catch(() => delete EVENT_SHARD_CACHE[month]);
+    }
+    return EVENT_SHARD_CACHE[month];
+}
 
-        if (!res.ok) throw new Error("API Error");
-        GLOBAL_DATA = await res.json();
+async function fetchLiveDetail(date) {
+    const res = await fetch(`${CONFIG.SUPABASE_URL}/rest/v1/pla_activity?select=original_text,pla_flight_events(time_range,aircraft_type,count,details)&activity_date=eq.${date}`, {
+        headers: API_HEADERS
+    });
+    if (!res.ok) throw new Error("API Error");
+    const rows = await res.json();
+    return rows.length ? { original_text: rows[0].original_text, events: rows[0].pla_flight_events || [] } : null;
+}
 
-        // Check Version
-        if (GLOBAL_DATA.length > 0) {
-            const latestDate = GLOBAL_DATA[GLOBAL_DATA.length - 1].activity_date;
-            document.getElementById('nav-ver').innerText = latestDate;
-            document.getElementById('ver-date').innerText = latestDate;
-            document.getElementById('startup-modal').classList.remove('hidden');
-        }
+function loadDetail(date) {
+    if (!DETAIL_CACHE[date]) {
+        DETAIL_CACHE[date] = (async () => {
+            const month = await loadEventShard(date.slice(0, 7));
+            return month[date] || await fetchLiveDetail(date) || { original_text: null, events: [] };
+        })();
+        // Don't memoize failures, so reopening the day retries
+        DETAIL_CACHE[date].catch(() => delete DETAIL_CACHE[date]);
+    }
+    return DETAIL_CACHE[date];
+}
 
+function setData(rows) {
+    GLOBAL_DATA = rows;
+    DAY_INDEX = {};
+    GLOBAL_DATA.forEach(d => { DAY_INDEX[d.activity_date] = d; });
+    syncWorker();
+}
+
+// --- Aggregation worker (aggregate_worker.js), used when there is no summary ---
+let AGG_WORKER = null;
+let AGG_SEQ = 0;
+const AGG_PENDING = {};     // request id -> resolve
+
+try {
+    AGG_WORKER = new Worker('aggregate_worker.js');
+    AGG_WORKER.onmessage = e => {
+        const resolve = AGG_PENDING[e.data.id];
+        delete AGG_PENDING[e.data.id];
+        if (resolve) resolve(e.data);
+    };
+} catch (e) {
+    console.warn('Web Worker unavailable, aggregating on the main thread', e);
+}
+
+function syncWorker() {
+    // The worker builds its columns once per dataset; only needed while aggregating in the browser
+    if (AGG_WORKER && !SUMMARY) AGG_WORKER.postMessage({ type: 'load', rows: GLOBAL_DATA });
+}
+
+function aggregateWindow(days) {
+    const id = ++AGG_SEQ;
+    return new Promise(resolve => {
+        AGG_PENDING[id] = resolve;
+        AGG_WORKER.postMessage({ type: 'window', id, days });
+    });
+}
+
+async function init() {
+    const [summary, manifest] = await Promise.all([loadSummary(), loadManifest()]);
+    SUMMARY = summary;
+    MANIFEST = manifest;
+    if (SUMMARY && SUMMARY.latest_date) {
+        showVersion(SUMMARY.latest_date);
         updateDashboard(0); // Default: ALL
+    }
+
+    try {
+        const summaryFresh = SUMMARY && (!MANIFEST || SUMMARY.latest_date === MANIFEST.latest_date);
+        if (MANIFEST && MANIFEST.shards.length) {
+            // With a fresh summary only the first screen of the log table is needed;
+            // older shards load as the table is scrolled
+            if (summaryFresh) await ensureRows(TABLE_ROWS + 1);
+            else await loadShards(MANIFEST.shards);
+        } else if (summaryFresh) {
+            // No snapshots published: page through the Supabase feed as needed
+            await ensureRows(TABLE_ROWS + 1);
+        } else {
+            await fetchLiveHistory();
+        }
+
+        const latestDate = GLOBAL_DATA.length > 0 ? GLOBAL_DATA[GLOBAL_DATA.length - 1].activity_date : null;
+        if (!SUMMARY || SUMMARY.latest_date !== latestDate) {
+            // No summary, or it is older than the data: fall back to computing in the browser
+            SUMMARY = null;
+            if (summaryFresh) {
+                // Only the table's rows were loaded; the windows need the whole history
+                if (MANIFEST && MANIFEST.shards.length) await loadShards(MANIFEST.shards);
+                else await fetchLiveHistory();
+            } else {
+                syncWorker();
+            }
+            if (latestDate) showVersion(latestDate);
+            updateDashboard(CURRENT_WINDOW);
+        }
         renderTable(GLOBAL_DATA);
 
     } catch (e) {
@@ -39,18 +228,44 @@ async function init() {
 function updateDashboard(days) {
     document.querySelectorAll('.filter-btn').forEach(btn => btn.classList.remove('active'));
     document.getElementById(`btn-${days}`).classList.add('active');
-
-    if (days > 0) {
-        CURRENT_CHART_DATA = GLOBAL_DATA.slice(-days);
+    CURRENT_WINDOW = days;
+
+    const summary = SUMMARY && SUMMARY.windows && SUMMARY.windows[String(days)];
+    if (summary) {
+        // Precomputed: daily points for the short windows, weekly rollups for all
+        if (days > 0) {
+            CURRENT_CHART_DATA = SUMMARY.daily.slice(-days);
+        } else {
+            CURRENT_CHART_DATA = SUMMARY.weekly.map(w => ({ ...w, activity_date: w.period }));
+        }
+        paintKPIs(summary);
+        paintComposition(summary.composition, summary.composition_total);
+    } else if (AGG_WORKER) {
+        // Off the main thread: the worker replies with KPIs and ready-to-plot rows
+        const seq = AGG_SEQ + 1;
+        aggregateWindow(days).then(res => {
+            if (seq !== AGG_SEQ || res.error) return; // a newer window was requested meanwhile
+            CURRENT_CHART_DATA = res.trend;
+            paintKPIs(res.kpis);
+            paintComposition(res.composition, res.composition_total);
+            renderTrendChart(res.trend);
+            renderOfficialShipsChart(res.official);
+            renderBalloonsChart(res.balloons);
+        });
+        return;
     } else {
-        CURRENT_CHART_DATA = GLOBAL_DATA;
+        if (days > 0) {
+            CURRENT_CHART_DATA = GLOBAL_DATA.slice(-days);
+        } else {
+            CURRENT_CHART_DATA = GLOBAL_DATA;
+        }
+        renderKPIs(CURRENT_CHART_DATA);
+        renderCompositionChart(CURRENT_CHART_DATA);
     }
 
-    renderKPIs(CURRENT_CHART_DATA);
     renderTrendChart(CURRENT_CHART_DATA);
     renderOfficialShipsChart(CURRENT_CHART_DATA);
     renderBalloonsChart(CURRENT_CHART_DATA);
-    renderCompositionChart(CURRENT_CHART_DATA);
 }
 
 // --- Render Functions ---
@@ -71,28 +286,74 @@ function renderKPIs(data) {
         }
     });
 
-    document.getElementById('kpi-total-aircraft').innerText = totalAir.toLocaleString();
-    document.getElementById('kpi-total-crossing').innerText = totalCross.toLocaleString();
-    document.getElementById('kpi-total-vessels').innerText = totalShip.toLocaleString();
-    document.getElementById('kpi-total-official').innerText = totalOfficial.toLocaleString();
-    document.getElementById('kpi-total-balloons').innerText = totalBalloons.toLocaleString();
-    
-    document.getElementById('kpi-max-day').innerText = maxVal;
-    document.getElementById('kpi-max-date').innerText = maxDate ? moment(maxDate).format('YYYY/MM/DD') : '--/--';
+    paintKPIs({
+        aircraft_total: totalAir,
+        aircraft_crossing: totalCross,
+        vessels_total: totalShip,
+        official_ships_total: totalOfficial,
+        balloons_total: totalBalloons,
+        max_day: maxVal,
+        max_date: maxDate
+    });
 }
 
-function renderTrendChart(data) {
-    const ctx = document.getElementById('trendChart').getContext('2d');
+function paintKPIs(k) {
+    document.getElementById('kpi-total-aircraft').innerText = k.aircraft_total.toLocaleString();
+    document.getElementById('kpi-total-crossing').innerText = k.aircraft_crossing.toLocaleString();
+    document.getElementById('kpi-total-vessels').innerText = k.vessels_total.toLocaleString();
+    document.getElementById('kpi-total-official').innerText = k.official_ships_total.toLocaleString();
+    document.getElementById('kpi-total-balloons').innerText = k.balloons_total.toLocaleString();
+
+    document.getElementById('kpi-max-day').innerText = k.max_day;
+    document.getElementById('kpi-max-date').innerText = k.max_date ? moment(k.max_date).format('YYYY/MM/DD') : '--/--';
+}
 
-    if (trendChartInstance) trendChartInstance.destroy();
+// --- Chart helpers: charts are created once, later windows only swap their data ---
+const MAX_CHART_POINTS = 400;
+
+function decimate(data, key, maxPoints = MAX_CHART_POINTS) {
+    // Keep one row per bucket, the one with the highest `key`, so peaks survive
+    if (data.length <= maxPoints) return data;
+    const size = Math.ceil(data.length / maxPoints);
+    const out = [];
+    for (let start = 0; start < data.length; start += size) {
+        let best = data[start];
+        for (let i = start + 1; i < Math.min(start + size, data.length); i++) {
+            if ((data[i][key] || 0) > (best[key] || 0)) best = data[i];
+        }
+        out.push(best);
+    }
+    return out;
+}
 
+function chartLabels(rows) {
+    return rows.map(d => moment(d.activity_date).format(d.period ? 'YYYY/MM/DD' : 'MM/DD'));
+}
+
+function updateChart(chart, labels, series) {
+    chart.data.labels = labels;
+    series.forEach((values, i) => { chart.data.datasets[i].data = values; });
+    chart.update('none');
+}
+
+function renderTrendChart(data) {
+    const rows = decimate(data, 'aircraft_total');
+    const labels = chartLabels(rows);
+    const series = [rows.map(d => d.aircraft_total), rows.map(d => d.aircraft_crossing), rows.map(d => d.vessels_total)];
+    if (trendChartInstance) {
+        trendChartInstance.$rows = rows;
+        updateChart(trendChartInstance, labels, series);
+        return;
+    }
+
+    const ctx = document.getElementById('trendChart').getContext('2d');
     trendChartInstance = new Chart(ctx, {
         data: {
-            labels: data.map(d => moment(d.activity_date).format('MM/DD')),
+            labels: labels,
             datasets: [{
                     type: 'line',
                     label: '總架次 (Air Total)',
-                    data: data.map(d => d.aircraft_total),
+                    data: series[0],
                     borderColor: '#3b82f6',
                     backgroundColor: 'rgba(59, 130, 246, 0.1)',
                     fill: true,
@@ -102,7 +363,7 @@ function renderTrendChart(data) {
                 {
                     type: 'bar',
                     label: '逾越中線 (Threat)',
-                    data: data.map(d => d.aircraft_crossing),
+                    data: series[1],
                     backgroundColor: 'rgba(239, 68, 68, 0.7)',
                     borderRadius: 2,
                     barPercentage: 0.6,
@@ -111,7 +372,7 @@ function renderTrendChart(data) {
                 {
                     type: 'line',
                     label: '共艦艘次 (Vessels)',
-                    data: data.map(d => d.vessels_total),
+                    data: series[2],
                     borderColor: '#06b6d4',
                     borderWidth: 2,
                     borderDash: [5, 5],
@@ -137,7 +398,9 @@ function renderTrendChart(data) {
                 }, true);
                 if (points.length) {
                     const index = points[0].index;
-                    const item = data[index];
+                    // Weekly rollup points have no single day to open
+                    const point = trendChartInstance.$rows[index];
+                    const item = point && !point.period ? DAY_INDEX[point.activity_date] : null;
                     if (item) openModal(item);
                 }
             },
@@ -204,20 +467,25 @@ function renderTrendChart(data) {
             }
         }
     });
+    trendChartInstance.$rows = rows;
 }
 
 function renderOfficialShipsChart(data) {
-    const ctx = document.getElementById('officialShipsChart').getContext('2d');
-
-    if (officialChartInstance) officialChartInstance.destroy();
+    const rows = decimate(data, 'official_ships_total');
+    const series = [rows.map(d => d.official_ships_total)];
+    if (officialChartInstance) {
+        updateChart(officialChartInstance, chartLabels(rows), series);
+        return;
+    }
 
+    const ctx = document.getElementById('officialShipsChart').getContext('2d');
     officialChartInstance = new Chart(ctx, {
         type: 'bar',
         data: {
-            labels: data.map(d => moment(d.activity_date).format('MM/DD')),
+            labels: chartLabels(rows),
             datasets: [{
                 label: '公務船 (Official Ships)',
-                data: data.map(d => d.official_ships_total),
+                data: series[0],
                 backgroundColor: 'rgba(234, 179, 8, 0.7)', // intel-yellow
                 borderRadius: 2,
                 barPercentage: 0.6
@@ -245,17 +513,21 @@ function renderOfficialShipsChart(data) {
 }
 
 function renderBalloonsChart(data) {
-    const ctx = document.getElementById('balloonsChart').getContext('2d');
-
-    if (balloonsChartInstance) balloonsChartInstance.destroy();
+    const rows = decimate(data, 'balloons_total');
+    const series = [rows.map(d => d.balloons_total)];
+    if (balloonsChartInstance) {
+        updateChart(balloonsChartInstance, chartLabels(rows), series);
+        return;
+    }
 
+    const ctx = document.getElementById('balloonsChart').getContext('2d');
     balloonsChartInstance = new Chart(ctx, {
         type: 'line',
         data: {
-            labels: data.map(d => moment(d.activity_date).format('MM/DD')),
+            labels: chartLabels(rows),
             datasets: [{
                 label: '空飄氣球 (Balloons)',
-                data: data.map(d => d.balloons_total),
+                data: series[0],
                 borderColor: '#a855f7', // intel-purple
                 backgroundColor: 'rgba(168, 85, 247, 0.1)',
                 borderWidth: 2,
@@ -286,10 +558,6 @@ function renderBalloonsChart(data) {
 }
 
 function renderCompositionChart(data) {
-    const ctx = document.getElementById('compositionChart').getContext('2d');
-
-    if (compositionChartInstance) compositionChartInstance.destroy();
-
     let counts = {
         "主戰機": 0,
         "輔戰機": 0,
@@ -298,7 +566,14 @@ function renderCompositionChart(data) {
     };
     let totalRecs = 0;
     data.forEach(d => {
-        if (d.pla_flight_events) {
+        if (d.composition) {
+            // Snapshot feed rows carry the day's buckets precomputed (snapshots.py)
+            counts["主戰機"] += d.composition[0];
+            counts["輔戰機"] += d.composition[1];
+            counts["無人機"] += d.composition[2];
+            counts["直升機"] += d.composition[3];
+            totalRecs += d.composition[4];
+        } else if (d.pla_flight_events) {
             d.pla_flight_events.forEach(e => {
                 const type = (e.aircraft_type || "").toLowerCase();
                 const c = e.count || 0;
@@ -311,8 +586,17 @@ function renderCompositionChart(data) {
         }
     });
 
+    paintComposition(counts, totalRecs);
+}
+
+function paintComposition(counts, totalRecs) {
     document.getElementById('comp-total').innerText = totalRecs.toLocaleString();
+    if (compositionChartInstance) {
+        updateChart(compositionChartInstance, Object.keys(counts), [Object.values(counts)]);
+        return;
+    }
 
+    const ctx = document.getElementById('compositionChart').getContext('2d');
     compositionChartInstance = new Chart(ctx, {
         type: 'doughnut',
         data: {
@@ -337,34 +621,37 @@ function renderCompositionChart(data) {
     });
 }
 
+// --- Log table: windowed rendering, only the rows in view (plus overscan) are in the DOM ---
+const TABLE_OVERSCAN = 10;
+let TABLE_DATA = [];        // newest first
+let TABLE_ROW_HEIGHT = 53;  // re-measured from the first rendered row
+let tableFrame = null;
+let tableLoading = false;
+
 function renderTable(data) {
-    const tbody = document.getElementById('table-body');
-    tbody.innerHTML = '';
-    // Recent first, show 100
-    const displayData = [...data].reverse().slice(0, 100);
-
-    displayData.forEach((item, index) => {
-        const tr = document.createElement('tr');
-        tr.className = "bg-slate-800/30 hover:bg-slate-700/50 transition border-b border-slate-700 cursor-pointer group";
-        tr.onclick = () => openModal(item);
-
-        const isThreat = item.aircraft_crossing > 0;
-
-        // Calculate Trend
-        let trendHtml = '';
-        const prevItem = displayData[index + 1]; // Since it's reversed, next item is previous day
-        if (prevItem) {
-            const diff = item.aircraft_total - prevItem.aircraft_total;
-            if (diff > 0) {
-                trendHtml = `<span class="text-red-400 text-xs font-mono ml-2">▲+${diff}</span>`;
-            } else if (diff < 0) {
-                trendHtml = `<span class="text-emerald-400 text-xs font-mono ml-2">▼${diff}</span>`;
-            } else {
-                trendHtml = `<span class="text-slate-500 text-xs font-mono ml-2">-</span>`;
-            }
+    TABLE_DATA = [...data].reverse();
+    drawTableWindow();
+}
+
+function tableRowHtml(item, index) {
+    const isThreat = item.aircraft_crossing > 0;
+
+    // Calculate Trend
+    let trendHtml = '';
+    const prevItem = TABLE_DATA[index + 1]; // Since it's reversed, next item is previous day
+    if (prevItem) {
+        const diff = item.aircraft_total - prevItem.aircraft_total;
+        if (diff > 0) {
+            trendHtml = `<span class="text-red-400 text-xs font-mono ml-2">▲+${diff}</span>`;
+        } else if (diff < 0) {
+            trendHtml = `<span class="text-emerald-400 text-xs font-mono ml-2">▼${diff}</span>`;
+        } else {
+            trendHtml = `<span class="text-slate-500 text-xs font-mono ml-2">-</span>`;
         }
+    }
 
-        tr.innerHTML = `
+    return `
+        <tr data-index="${index}" class="bg-slate-800/30 hover:bg-slate-700/50 transition border-b border-slate-700 cursor-pointer group">
             <td class="px-6 py-4 font-mono text-slate-300 group-hover:text-white transition whitespace-nowrap">${item.activity_date}</td>
             <td class="px-6 py-4 text-center font-bold text-white whitespace-nowrap">${item.aircraft_total}</td>
             <td class="px-6 py-4 text-center whitespace-nowrap ${isThreat ? 'text-red-400 font-bold' : 'text-slate-600'}">${item.aircraft_crossing || '-'}</td>
@@ -376,11 +663,55 @@ function renderTable(data) {
             <td class="px-6 py-4 text-right whitespace-nowrap">
                 <button class="text-xs bg-slate-700 hover:bg-blue-600 text-white px-3 py-1 rounded transition">詳細</button>
             </td>
-        `;
-        tbody.appendChild(tr);
-    });
+        </tr>`;
 }
 
+function drawTableWindow() {
+    const scroller = document.getElementById('table-scroll');
+    const tbody = document.getElementById('table-body');
+    const visible = Math.ceil(scroller.clientHeight / TABLE_ROW_HEIGHT);
+    const first = Math.max(0, Math.floor(scroller.scrollTop / TABLE_ROW_HEIGHT) - TABLE_OVERSCAN);
+    const last = Math.min(TABLE_DATA.length, first + visible + 2 * TABLE_OVERSCAN);
+
+    // Spacer rows stand in for everything above and below the window
+    let html = first > 0 ? `<tr style="height:${first * TABLE_ROW_HEIGHT}px"></tr>` : '';
+    for (let i = first; i < last; i++) html += tableRowHtml(TABLE_DATA[i], i);
+    if (last < TABLE_DATA.length) html += `<tr style="height:${(TABLE_DATA.length - last) * TABLE_ROW_HEIGHT}px"></tr>`;
+    tbody.innerHTML = html;
+
+    const row = tbody.querySelector('tr[data-index]');
+    if (row && row.offsetHeight && Math.abs(row.offsetHeight - TABLE_ROW_HEIGHT) > 1) {
+        TABLE_ROW_HEIGHT = row.offsetHeight;
+        drawTableWindow();
+        return;
+    }
+
+    // Near the end of what is loaded: pull in the next older shard/page
+    if (last >= TABLE_DATA.length - TABLE_OVERSCAN && !tableLoading) {
+        tableLoading = true;
+        loadMoreHistory().then(loaded => {
+            tableLoading = false;
+            if (loaded) renderTable(GLOBAL_DATA);
+        }).catch(e => {
+            tableLoading = false;
+            console.error(e);
+        });
+    }
+}
+
+document.getElementById('table-scroll').addEventListener('scroll', () => {
+    if (tableFrame) return;
+    tableFrame = requestAnimationFrame(() => {
+        tableFrame = null;
+        drawTableWindow();
+    });
+});
+
+document.getElementById('table-body').addEventListener('click', e => {
+    const row = e.target.closest('tr[data-index]');
+    if (row) openModal(TABLE_DATA[Number(row.dataset.index)]);
+});
+
 // --- Modal Logic ---
 const modal = document.getElementById('detail-modal');
 const modalContent = document.getElementById('modal-content');
@@ -436,10 +767,32 @@ function openModal(item) {
             </div>`;
     }
 
-    // --- Timeline ---
+    // --- Timeline & report text: fetched on demand, memoized per day ---
+    const timeline = document.getElementById('modal-timeline');
+    timeline.innerHTML = `<p class="text-sm text-slate-500 italic py-4">載入中...</p>`;
+    document.getElementById('modal-text').innerText = '';
+    const date = item.activity_date;
+    loadDetail(date).then(detail => {
+        // Ignore a slow response for a day that is no longer shown
+        if (document.getElementById('modal-date').innerText === date) renderDetail(detail);
+    }).catch(e => {
+        console.error(e);
+        if (document.getElementById('modal-date').innerText === date) {
+            timeline.innerHTML = `<p class="text-sm text-red-500 py-4">載入失敗: ${e.message}</p>`;
+        }
+    });
+
+    modal.classList.remove('hidden');
+    setTimeout(() => {
+        modalContent.classList.remove('scale-95', 'opacity-0');
+        modalContent.classList.add('scale-100', 'opacity-100');
+    }, 10);
+}
+
+function renderDetail(detail) {
     const timeline = document.getElementById('modal-timeline');
     timeline.innerHTML = '';
-    const events = item.pla_flight_events || [];
+    const events = [...(detail.events || [])];
     events.sort((a, b) => (a.time_range || '').localeCompare(b.time_range || ''));
 
     if (events.length === 0) {
@@ -477,13 +830,7 @@ function openModal(item) {
         });
     }
 
-    document.getElementById('modal-text').innerText = item.original_text || "無文字報告";
-
-    modal.classList.remove('hidden');
-    setTimeout(() => {
-        modalContent.classList.remove('scale-95', 'opacity-0');
-        modalContent.classList.add('scale-100', 'opacity-100');
-    }, 10);
+    document.getElementById('modal-text').innerText = detail.original_text || "無文字報告";
 }
 
 function closeModal() {
@@ -503,5 +850,10 @@ modal.addEventListener('click', (e) => {
     if (e.target === modal) closeModal();
 });
 
+// Offline support: sw.js caches the app shell and the snapshot shards
+if ('serviceWorker' in navigator) {
+    navigator.serviceWorker.register('sw.js').catch(e => console.warn('Service worker not registered', e));
+}
+
 // Run
 init();
@@ -0,0 +1,100 @@
+import os
+import sys
+import glob
+import time
+import image_store
+import ocr_engine
+import ocr_preprocess
+
+# Decode benchmark + regression check for the OCR image loader.
+#
+#   python bench_decode.py [rounds]
+#   OCR_TARGET_WIDTH=360 python bench_decode.py   # lets JPEGs decode at 1/2 scale
+#
+# For every stored bulletin image (bytes read up front, so disk I/O is not
+# timed) it compares:
+#   legacy  full RGB decode, fixed crop, RGB->L (what ocr_image used to do)
+#   full    full decode of the whole image to grayscale
+#   draft   ocr_preprocess.decode: JPEG draft mode straight to 'L', DCT-scaled
+#           when OCR_TARGET_WIDTH allows
+# and fails (exit 1) if the table found on the draft decode differs from the
+# one found on the full decode.
+
+
+def load_corpus():
+    index = image_store.load_index()
+    paths = sorted({image_store.path_for(entry) for entry in index.values()})
+    if not paths:
+        paths = sorted(glob.glob(os.path.join(image_store.IMAGE_DIR, "*.jpg")) +
+                       glob.glob(os.path.join(image_store.IMAGE_DIR, "*.png")))
+    corpus = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            data = f.read()
+        with image_store.open_image(data) as img:
+            corpus.append((path, img.format, data))
+    return corpus
+
+
+def legacy_decode(data):
+    with image_store.open_image(data) as img:
+        return img.crop(ocr_engine.crop_rect(*img.size)).convert('L')
+
+
+def full_decode(data):
+    with image_store.open_image(data) as img:
+        return ocr_preprocess.to_gray(img)
+
+
+def draft_decode(data):
+    with image_store.open_image(data) as img:
+        return ocr_preprocess.decode(img)
+
+
+def timed(func, items, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for data in items:
+            func(data)
+    return (time.perf_counter() - started) / (rounds * len(items))
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    corpus = load_corpus()
+    if not corpus:
+        print("No images found.")
+        return
+    print(f"Corpus: {len(corpus)} images, OCR_TARGET_WIDTH={ocr_preprocess.TARGET_WIDTH}, detector {ocr_preprocess.DETECTOR}")
+
+    mismatches = 0
+    for path, fmt, data in corpus:
+        with image_store.open_image(data) as img:
+            size = img.size
+            expected = ocr_preprocess.detect_table(ocr_preprocess.to_gray(img), size)
+        with image_store.open_image(data) as img:
+            gray = ocr_preprocess.decode(img)
+            found = ocr_preprocess.detect_table(gray, size)
+        if (expected is None) != (found is None) or (
+                expected and max(abs(a - b) for a, b in zip(expected, found)) > ocr_preprocess.PAD * 2):
+            mismatches += 1
+            print(f"MISMATCH: {path} full={expected} draft={found} (decoded {gray.size[0]}x{gray.size[1]})")
+
+    for fmt in sorted({fmt for _, fmt, _ in corpus}):
+        items = [data for _, f, data in corpus if f == fmt]
+        legacy = timed(legacy_decode, items, rounds)
+        full = timed(full_decode, items, rounds)
+        draft = timed(draft_decode, items, rounds)
+        print(f"{fmt} ({len(items)} images)")
+        print(f"  legacy crop+convert: {legacy * 1e3:7.2f} ms/image")
+        print(f"  full grayscale:      {full * 1e3:7.2f} ms/image")
+        print(f"  draft decode:        {draft * 1e3:7.2f} ms/image ({legacy / draft:.2f}x vs legacy)")
+
+    if mismatches:
+        print(f"FAIL: {mismatches} images gave a different table region.")
+        sys.exit(1)
+    print("OK: the draft decode finds the same table region on every image.")
+
+
+if __name__ == "__main__":
+    main()
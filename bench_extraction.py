@@ -0,0 +1,141 @@
+import os
+import re
+import sys
+import time
+from jsonl_io import read_records
+import text_extraction
+import analyze_pla_data
+import update_pla_data
+from text_extraction import COUNT_FIELDS
+
+# Microbenchmark + regression check for the bulletin count extraction.
+#
+#   python bench_extraction.py [corpus.jsonl]
+#
+# The corpus is FIXTURE_FILE, representative bulletin texts with their expected
+# counts, covering every field and phrasing (crossings in parentheses, 架/架次,
+# 艘/艘次, spaces, 共艦 without a number, balloons in 顆/枚), plus every
+# original_text/content in the historical corpus when one is on disk. It
+# times the original per-field re.search implementation against
+# text_extraction and fails (exit 1) if
+#   - either production code path disagrees with the updater's old code or,
+#     for the fixture, with the expected counts,
+#   - the analyzer's old code found a count the new code reads differently
+#     (the old analyzer missed spaced and 架/艘次 forms; a 0 it missed is allowed),
+#   - the corpus is empty or has no non-zero example of some field.
+FIXTURE_FILE = os.path.join("need_scrape", "activity_texts.jsonl")
+
+CORPUS_CANDIDATES = [
+    "merged_pla_data.jsonl",
+    "archive/merged_pla_data.jsonl",
+    "pla_analysis.jsonl",
+    "archive/pla_analysis.jsonl",
+    "pla_details.jsonl",
+    "archive/pla_details.jsonl",
+]
+
+
+def legacy_counts(text):
+    # The extraction as it was in update_pla_data before text_extraction (uncompiled, one search per field)
+    data = dict.fromkeys(COUNT_FIELDS, 0)
+    match = re.search(r'共機\s*(\d+)\s*(?:架|架次)', text)
+    if match: data["aircraft_total"] = int(match.group(1))
+    paren_match = re.search(r'\((.*?)\)', text)
+    if paren_match:
+        crossing = re.search(r'(\d+)\s*(?:架|架次)', paren_match.group(1))
+        if crossing: data["aircraft_crossing"] = int(crossing.group(1))
+    match = re.search(r'共艦\s*(\d+)\s*(?:艘|艘次)', text)
+    if match: data["vessels_total"] = int(match.group(1))
+    match = re.search(r'公務船\s*(\d+)\s*(?:艘|艘次)', text)
+    if match: data["official_ships_total"] = int(match.group(1))
+    match = re.search(r'空飄氣球.*?(\d+)[顆枚]', text)
+    if match: data["balloons_total"] = int(match.group(1))
+    return data
+
+
+def legacy_analyzer_counts(text):
+    # The extraction as it was in analyze_pla_data before text_extraction (no spaces, 架次/艘 only)
+    data = dict.fromkeys(COUNT_FIELDS, 0)
+    match = re.search(r'共機(\d+)架次', text)
+    if match: data["aircraft_total"] = int(match.group(1))
+    paren_match = re.search(r'\((.*?)\)', text)
+    if paren_match:
+        crossing = re.search(r'(\d+)架次', paren_match.group(1))
+        if crossing: data["aircraft_crossing"] = int(crossing.group(1))
+    match = re.search(r'共艦(\d+)艘', text)
+    if match: data["vessels_total"] = int(match.group(1))
+    match = re.search(r'公務船(\d+)艘', text)
+    if match: data["official_ships_total"] = int(match.group(1))
+    match = re.search(r'空飄氣球.*?(\d+)[顆枚]', text)
+    if match: data["balloons_total"] = int(match.group(1))
+    return data
+
+
+def load_corpus(path=None):
+    """Returns (sources, [(text, expected counts or None)]): the fixture plus the first history file found."""
+    corpus = [(r['original_text'], r['expected']) for r in read_records(FIXTURE_FILE)]
+    sources = [FIXTURE_FILE]
+    for candidate in [path] if path else CORPUS_CANDIDATES:
+        if os.path.exists(candidate) or os.path.exists(candidate[:-1]):
+            texts = [r.get('original_text') or r.get('content') or '' for r in read_records(candidate)]
+            corpus.extend((text, None) for text in texts if text)
+            sources.append(candidate)
+            break
+    return sources, corpus
+
+
+def timed(func, texts, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for text in texts:
+            func(text)
+    return (time.perf_counter() - started) / (rounds * len(texts))
+
+
+def main():
+    sources, corpus = load_corpus(sys.argv[1] if len(sys.argv) > 1 else None)
+    texts = [text for text, _ in corpus]
+    print(f"Corpus: {len(texts)} texts from {', '.join(sources)}")
+    if not texts:
+        print("FAIL: empty corpus.")
+        sys.exit(1)
+
+    mismatches = analyzer_gained = 0
+    covered = dict.fromkeys(COUNT_FIELDS, 0)
+    for text, expected in corpus:
+        reference = legacy_counts(text)
+        updater = update_pla_data.analyze_text_content(text)
+        analyzer = {k: v for k, v in analyze_pla_data.extract_numbers(text).items() if k != "details"}
+        old_analyzer = legacy_analyzer_counts(text)
+        # The old analyzer may have missed a count (0), never read a different one
+        analyzer_ok = all(old_analyzer[k] in (0, analyzer[k]) for k in COUNT_FIELDS)
+        if not (reference == updater == analyzer and analyzer_ok and expected in (None, reference)):
+            mismatches += 1
+            print(f"MISMATCH: {text[:60]!r}\n  expected={expected}\n  legacy update_pla_data={reference}\n"
+                  f"  legacy analyze_pla_data={old_analyzer}\n  update_pla_data={updater}\n  analyze_pla_data={analyzer}")
+        elif old_analyzer != analyzer:
+            analyzer_gained += 1
+        for field in COUNT_FIELDS:
+            covered[field] += bool(updater[field])
+
+    missing = [field for field, n in covered.items() if not n]
+    if missing:
+        print(f"FAIL: no text in the corpus has a non-zero {', '.join(missing)}.")
+        sys.exit(1)
+    print("Texts with each count: " + ", ".join(f"{field} {n}" for field, n in covered.items()))
+    print(f"{analyzer_gained} texts the old analyzer under-read (spaced or 架/艘次 forms).")
+
+    rounds = max(1, 20000 // len(texts))
+    legacy = timed(legacy_counts, texts, rounds)
+    compiled = timed(text_extraction.extract_counts, texts, rounds)
+    print(f"legacy re.search:  {legacy * 1e6:8.2f} us/text")
+    print(f"text_extraction:   {compiled * 1e6:8.2f} us/text ({legacy / compiled:.2f}x)")
+
+    if mismatches:
+        print(f"FAIL: {mismatches} texts extracted differently.")
+        sys.exit(1)
+    print("OK: both code paths match the reference on every text.")
+
+
+if __name__ == "__main__":
+    main()
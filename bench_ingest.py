@@ -0,0 +1,273 @@
+import os
+import sys
+import json
+import time
+import hashlib
+from list_crawler import parse_list_page
+import image_store
+import ocr_engine
+import ocr_preprocess
+import ocr_classifier
+import clean_ocr_data
+import supabase_api
+import text_extraction
+from jsonl_io import read_records
+import update_pla_data
+from bench_decode import load_corpus as load_images
+
+# Benchmark harness + golden check for the whole ingest path, on committed
+# inputs only: the saved need_scrape/list.html and detail.html and the images/
+# corpus. Each stage is timed per item (throughput, p50/p95 latency):
+#
+#   list_parse      list page -> bulletin links            (list_crawler)
+#   detail_parse    bulletin page -> activity text + image  (update_pla_data)
+#   text_extract    activity text -> counts                 (text_extraction)
+#   decode_detect   image bytes -> grayscale + table box    (ocr_preprocess)
+#   ocr             table crop -> lines                     (ocr_engine; needs Tesseract)
+#   event_parse     OCR lines -> flight events              (ocr_classifier)
+#   serialize       records -> Supabase upsert payloads     (supabase_api)
+#
+# and its output is compared with GOLDEN_FILE; any difference fails the run
+# (exit 1). event_parse always covers OCR_FIXTURE, representative OCR lines
+# (Chinese and English tables, 計N counts, repeated counts, OCR noise) with
+# the events they must give (`cleaned_events` where clean_ocr_data, one aircraft
+# type per line, differs), so ocr_classifier is checked on every run. It also
+# parses the corpus's own OCR output: fresh from Tesseract, or, without
+# Tesseract, the lines recorded in the golden file if it has any.
+#
+#   python bench_ingest.py [--update-golden] [--images=N] [--rounds=N]
+#                          [--timings=out.json] [--baseline=previous.json]
+#
+# --timings writes the stage timings. The run fails if a stage's p50 is more
+# than BENCH_MAX_SLOWDOWN times the baseline's (and slower by at least
+# BENCH_MIN_DELTA_MS, so microsecond stages don't trip on noise); the baseline
+# is TIMINGS_FILE unless --baseline names another (--baseline= for none).
+# Refresh the reference with --timings=bench_timings.json.
+#
+# With Tesseract the golden file must hold the corpus's ocr_lines and events,
+# so fresh OCR is compared too; record them with --update-golden (the Record
+# golden workflow does this on a runner with Tesseract).
+GOLDEN_FILE = os.environ.get("BENCH_GOLDEN_FILE", "bench_golden.json")
+TIMINGS_FILE = os.environ.get("BENCH_TIMINGS_FILE", "bench_timings.json")
+LIST_PAGE = os.path.join("need_scrape", "list.html")
+DETAIL_PAGE = os.path.join("need_scrape", "detail.html")
+OCR_FIXTURE = os.path.join("need_scrape", "ocr_lines.jsonl")
+MAX_SLOWDOWN = float(os.environ.get("BENCH_MAX_SLOWDOWN", "1.5"))
+MIN_DELTA_MS = float(os.environ.get("BENCH_MIN_DELTA_MS", "0.1"))
+
+# Golden sections keyed by image file
+PER_IMAGE = ("regions", "ocr_lines", "events", "payloads")
+
+
+def option(name, default=None):
+    prefix = f"--{name}="
+    for arg in sys.argv[1:]:
+        if arg.startswith(prefix):
+            return arg[len(prefix):]
+    return default
+
+
+def percentile(sorted_values, fraction):
+    # Nearest rank
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))]
+
+
+def run_stage(timings, name, func, items):
+    """Runs func over items, recording per-item latency under `name`. Returns the results."""
+    results, latencies = [], []
+    for item in items:
+        started = time.perf_counter()
+        results.append(func(item))
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    total = sum(latencies)
+    timings[name] = {"items": len(latencies), "throughput": len(latencies) / total if total else 0.0,
+                     "p50_ms": percentile(latencies, 0.50) * 1e3, "p95_ms": percentile(latencies, 0.95) * 1e3}
+    return results
+
+
+def decode_detect(data):
+    with image_store.open_image(data) as img:
+        size = img.size
+        return list(ocr_preprocess.detect_table(ocr_preprocess.decode(img), size) or ocr_engine.crop_rect(*size))
+
+
+def ocr_lines(data):
+    with image_store.open_image(data) as img:
+        return ocr_engine.ocr_image(img, None, use_cache=False)[0]
+
+
+def payload(record):
+    # What supabase_api.upsert_batch sends for one record (activity row + its events)
+    return json.dumps(supabase_api.batch_row(record), ensure_ascii=False)
+
+
+def image_dates():
+    dates = {}
+    for date_str, entry in sorted(image_store.load_index().items()):
+        dates.setdefault(entry['file'], date_str)
+    return dates
+
+
+def run(rounds, limit):
+    timings, output = {}, {}
+    with open(LIST_PAGE, 'r', encoding='utf-8') as f:
+        list_html = f.read()
+    with open(DETAIL_PAGE, 'r', encoding='utf-8') as f:
+        detail_html = f.read()
+
+    output["list_page"] = run_stage(timings, "list_parse", parse_list_page, [list_html] * rounds)[0]
+    text, image_url = run_stage(timings, "detail_parse", update_pla_data.parse_detail, [detail_html] * rounds)[0]
+    output["detail"] = {"text": text, "image_url": image_url if not (image_url or '').startswith('data:') else
+                        'data:' + hashlib.sha256(image_url.encode()).hexdigest()}
+    counts = run_stage(timings, "text_extract", text_extraction.extract_counts, [text] * rounds * 10)[0]
+    output["counts"] = counts
+
+    images = load_images()[:limit]
+    names = [os.path.relpath(path, image_store.IMAGE_DIR).replace(os.sep, '/') for path, _, _ in images]
+    regions = run_stage(timings, "decode_detect", decode_detect, [data for _, _, data in images])
+    output["regions"] = dict(zip(names, regions))
+
+    golden = load_golden()
+    lines = None
+    if ocr_engine.TESSERACT_AVAILABLE:
+        lines = dict(zip(names, run_stage(timings, "ocr", ocr_lines, [data for _, _, data in images])))
+    elif golden and golden.get("ocr_lines"):
+        print("Tesseract not available: parsing the OCR lines recorded in the golden file.")
+        lines = {name: golden["ocr_lines"][name] for name in names if name in golden["ocr_lines"]}
+    else:
+        print("Tesseract not available and no OCR lines recorded: event_parse runs on the OCR fixture only.")
+    fixture = list(read_records(OCR_FIXTURE))
+    names_parsed = list(lines or {})
+    events = run_stage(timings, "event_parse", ocr_classifier.parse_lines,
+                       [case["lines"] for case in fixture] + [lines[name] for name in names_parsed])
+    fixture_failures = check_fixture(fixture, events[:len(fixture)])
+    if lines is not None:
+        output["ocr_lines"] = lines
+        output["events"] = dict(zip(names_parsed, events[len(fixture):]))
+
+    dates = image_dates()
+    records = [dict(counts, activity_date=dates.get(name, os.path.splitext(os.path.basename(name))[0]),
+                    original_text=text, image_file=name, events=output.get("events", {}).get(name, []))
+               for name in names]
+    payloads = run_stage(timings, "serialize", payload, records)
+    output["payloads"] = {name: hashlib.sha256(body.encode('utf-8')).hexdigest()[:16] for name, body in zip(names, payloads)}
+    output["payload_events"] = "events" in output
+    return timings, output, fixture_failures
+
+
+def check_fixture(fixture, events):
+    """
+    Returns the number of OCR fixture cases whose parsed events differ from the
+    expected ones: `events` for update_pla_data's parse, and `cleaned_events`
+    (where it differs) for clean_ocr_data, which keeps one aircraft type per line.
+    """
+    failures = 0
+    cleaned = clean_ocr_data.clean_records({"raw_text": case["lines"]} for case in fixture)
+    for case, found, clean in zip(fixture, events, cleaned):
+        clean_found = [{k: v for k, v in evt.items() if k != "raw_lines"} for evt in clean["events"]]
+        for path, expected, now in (("update_pla_data", case["events"], found),
+                                    ("clean_ocr_data", case.get("cleaned_events", case["events"]), clean_found)):
+            if now != expected:
+                failures += 1
+                print(f"MISMATCH OCR fixture, {path} ({case['note']}):\n  expected={json.dumps(expected, ensure_ascii=False)}\n"
+                      f"  now={json.dumps(now, ensure_ascii=False)}")
+    if not fixture:
+        print(f"MISMATCH: no cases in {OCR_FIXTURE}.")
+        return 1
+    return failures
+
+
+def load_golden():
+    try:
+        with open(GOLDEN_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def compare(golden, output):
+    """Returns the number of sections that differ from the golden output."""
+    failures = 0
+    for section, value in output.items():
+        if section == "payload_events" or section not in golden:
+            continue
+        if section == "payloads" and golden.get("payload_events") != output["payload_events"]:
+            # Recorded with (or without) parsed events: not comparable
+            continue
+        expected = golden[section]
+        if section in PER_IMAGE:
+            # Only the images present in both (--images may limit the run)
+            keys = [key for key in value if key in expected]
+            diff = [key for key in keys if expected[key] != value[key]]
+            if diff:
+                failures += 1
+                print(f"MISMATCH {section}: {len(diff)}/{len(keys)} images differ, e.g.")
+                for key in diff[:5]:
+                    print(f"  {key}: golden={expected[key]} now={value[key]}")
+        elif expected != value:
+            failures += 1
+            print(f"MISMATCH {section}:\n  golden={json.dumps(expected, ensure_ascii=False)[:300]}\n"
+                  f"  now={json.dumps(value, ensure_ascii=False)[:300]}")
+    return failures
+
+
+def compare_timings(baseline, timings):
+    slower = 0
+    for stage, result in timings.items():
+        before = baseline.get(stage)
+        if before and result["p50_ms"] > max(before["p50_ms"] * MAX_SLOWDOWN, before["p50_ms"] + MIN_DELTA_MS):
+            slower += 1
+            print(f"SLOWER {stage}: p50 {result['p50_ms']:.3f} ms vs {before['p50_ms']:.3f} ms in the baseline")
+    return slower
+
+
+def main():
+    rounds = int(option("rounds", "20"))
+    limit = int(option("images")) if option("images") else None
+    timings, output, failures = run(rounds, limit)
+
+    print(f"{'stage':<14}{'items':>7}{'items/s':>12}{'p50 ms':>10}{'p95 ms':>10}")
+    for stage, result in timings.items():
+        print(f"{stage:<14}{result['items']:>7}{result['throughput']:>12.1f}{result['p50_ms']:>10.3f}{result['p95_ms']:>10.3f}")
+
+    baseline = option("baseline", TIMINGS_FILE)
+    if baseline and os.path.exists(baseline):
+        with open(baseline, 'r', encoding='utf-8') as f:
+            failures += compare_timings(json.load(f), timings)
+    elif baseline:
+        print(f"No {baseline}; timings not compared.")
+
+    if option("timings"):
+        with open(option("timings"), 'w', encoding='utf-8') as f:
+            json.dump(timings, f, indent=1)
+
+    golden = load_golden()
+    if "--update-golden" in sys.argv:
+        if golden and limit:
+            # Keep the images this run did not cover
+            for section in PER_IMAGE:
+                if section in output:
+                    output[section] = dict(golden.get(section, {}), **output[section])
+        with open(GOLDEN_FILE, 'w', encoding='utf-8') as f:
+            json.dump(output, f, ensure_ascii=False, indent=1, sort_keys=True)
+        print(f"Wrote {GOLDEN_FILE}.")
+    elif golden is None:
+        print(f"No {GOLDEN_FILE}; run with --update-golden to record one.")
+    else:
+        failures += compare(golden, output)
+        if "ocr_lines" in output and not golden.get("ocr_lines"):
+            # Fresh OCR output with nothing to check it against
+            failures += 1
+            print(f"MISMATCH ocr_lines: {GOLDEN_FILE} has none; record them with --update-golden where Tesseract is installed.")
+
+    if failures:
+        print(f"FAIL: {failures} regressions.")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
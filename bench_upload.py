@@ -0,0 +1,166 @@
+import os
+import sys
+import csv
+import time
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+# Offline load test of the Supabase upload path against fake_postgrest.py.
+#
+#   python bench_upload.py [--scale=100] [--batch=500] [--daily=30] [--keep]
+#
+# Synthesizes `scale` times the history in pla_activity.csv (one activity row
+# per day, 0-6 flight events each, dates running back from the first real
+# day), starts the fake server on a throwaway SQLite file and times, through
+# the same code the scripts use:
+#
+#   bulk_load      supabase_api.upsert_batch over the whole history (migrate_to_supabase)
+#   reupload       the same again: every row conflicts and is merged
+#   known_dates    sync_state.known_dates_since over the look-back window
+#   daily_upsert   one-day batches at the head of the history (update_pla_data)
+#   snapshot_read  snapshots.remote_rows: paged reads with embedded events
+#
+# then checks the server holds exactly one row per day and the right number
+# of events. --keep leaves the database file in place.
+HISTORY_FILE = "pla_activity.csv"
+AIRCRAFT_TYPES = ["主戰機", "輔戰機", "無人機", "直升機", "fighter", "UAV"]
+
+
+def option(name, default=None):
+    prefix = f"--{name}="
+    for arg in sys.argv[1:]:
+        if arg.startswith(prefix):
+            return arg[len(prefix):]
+    return default
+
+
+def percentile(sorted_values, fraction):
+    # Nearest rank
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))]
+
+
+def history_days():
+    with open(HISTORY_FILE, 'r', encoding='utf-8-sig') as f:
+        return sorted(row['date'] for row in csv.DictReader(f) if row.get('date'))
+
+
+def synthesize(scale):
+    """Merged records for `scale` times the real history, oldest first."""
+    real = history_days()
+    last = datetime.strptime(real[-1], '%Y-%m-%d')
+    rng = random.Random(1)
+    records = []
+    for offset in range(len(real) * scale - 1, -1, -1):
+        day = last - timedelta(days=offset)
+        date_str = day.strftime('%Y-%m-%d')
+        events = [{"time": f"{rng.randint(0, 11):02d}00-{rng.randint(12, 23):02d}00",
+                   "aircraft_type": rng.choice(AIRCRAFT_TYPES), "count": rng.randint(1, 20),
+                   "details": [f"{rng.choice(['北部', '中部', '西南'])}空域"]}
+                  for _ in range(rng.randint(0, 6))]
+        records.append({
+            "activity_date": date_str,
+            "link": f"https://www.mnd.gov.tw/news/plaact/{100000 + offset}",
+            "aircraft_total": sum(evt['count'] for evt in events),
+            "aircraft_crossing": rng.randint(0, 10),
+            "vessels_total": rng.randint(0, 12),
+            "official_ships_total": rng.randint(0, 3),
+            "balloons_total": rng.randint(0, 2),
+            "original_text": f"{date_str} 共機{len(events)}批次",
+            "image_file": f"{date_str}.jpg",
+            "events": events,
+        })
+    return records
+
+
+def timed(timings, name, func, items, units=None):
+    """Runs func over items, recording per-call latency and `units` (per item) per second."""
+    latencies, done = [], 0
+    for item in items:
+        started = time.perf_counter()
+        func(item)
+        latencies.append(time.perf_counter() - started)
+        done += units(item) if units else 1
+    latencies.sort()
+    total = sum(latencies)
+    timings[name] = {"calls": len(latencies), "units": done, "per_s": done / total if total else 0.0,
+                     "p50_ms": percentile(latencies, 0.50) * 1e3, "p95_ms": percentile(latencies, 0.95) * 1e3}
+
+
+def count(supabase_api, http_client, table):
+    resp = http_client.get(f"{supabase_api.rest_url(table)}?select=id&limit=1",
+                           headers=dict(supabase_api.HEADERS, Prefer="count=exact"), timeout=60)
+    resp.raise_for_status()
+    return int(resp.headers["Content-Range"].split("/")[-1])
+
+
+def main():
+    scale = int(option("scale", "100"))
+    batch_size = int(option("batch", "500"))
+    daily = int(option("daily", "30"))
+
+    # The server and the API client both read their configuration at import
+    workdir = tempfile.mkdtemp(prefix="fake_postgrest_")
+    os.environ["FAKE_POSTGREST_DB"] = os.path.join(workdir, "bench.sqlite")
+    import fake_postgrest
+    server = fake_postgrest.serve(0)
+    os.environ["SUPABASE_URL"] = f"http://127.0.0.1:{server.server_port}"
+    import http_client
+    import supabase_api
+    import sync_state
+    import snapshots
+
+    records = synthesize(scale)
+    events = sum(len(record['events']) for record in records)
+    print(f"{len(records)} days ({scale}x history), {events} events, batches of {batch_size}, "
+          f"server {supabase_api.SUPABASE_URL}, database {fake_postgrest.DB_FILE}")
+
+    batches = [records[i:i + batch_size] for i in range(0, len(records), batch_size)]
+    head = records[-daily:] if daily else []
+    days = lambda batch: len(batch)
+    timings = {}
+    timed(timings, "bulk_load", supabase_api.upsert_batch, batches, days)
+    timed(timings, "reupload", supabase_api.upsert_batch, batches, days)
+    start = (datetime.strptime(records[-1]['activity_date'], '%Y-%m-%d') -
+             timedelta(days=sync_state.LOOKBACK_DAYS)).strftime('%Y-%m-%d')
+    timed(timings, "known_dates", sync_state.known_dates_since, [start] * 20)
+    timed(timings, "daily_upsert", supabase_api.upsert_batch, [[record] for record in head], days)
+    read = []
+    timed(timings, "snapshot_read", lambda _: read.extend(snapshots.remote_rows()), [None],
+          lambda _: len(read))
+
+    print(f"{'stage':<15}{'calls':>7}{'units':>9}{'units/s':>11}{'p50 ms':>10}{'p95 ms':>10}")
+    for stage, result in timings.items():
+        print(f"{stage:<15}{result['calls']:>7}{result['units']:>9}{result['per_s']:>11.1f}"
+              f"{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}")
+
+    failures = []
+    stored_days = count(supabase_api, http_client, 'pla_activity')
+    stored_events = count(supabase_api, http_client, 'pla_flight_events')
+    if stored_days != len(records):
+        failures.append(f"{stored_days} activity rows stored, expected {len(records)}")
+    if stored_events != events:
+        failures.append(f"{stored_events} events stored, expected {events}")
+    if len(read) != len(records) or sum(len(row['pla_flight_events']) for row in read) != events:
+        failures.append(f"snapshot read returned {len(read)} days")
+
+    server.shutdown()
+    if "--keep" not in sys.argv:
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.remove(fake_postgrest.DB_FILE + suffix)
+            except FileNotFoundError:
+                pass
+        os.rmdir(workdir)
+
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print("OK: one row per day and every event stored.")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,7 +9,7 @@ def cleanup_files():
         os.makedirs(archive_dir)
 
     # Files to move
-    files_to_move = glob.glob('*.json') + glob.glob('*.csv')
+    files_to_move = glob.glob('*.json') + glob.glob('*.jsonl') + glob.glob('*.csv')
     
     for f in files_to_move:
         # Skip package-lock or other config jsons if any (not present here based on history)
@@ -1,20 +1,69 @@
-import requests
+import http_cache
 from bs4 import BeautifulSoup
 import csv
-import json
+from jsonl_io import JsonlWriter
 import concurrent.futures
-import urllib3
 from datetime import datetime, timedelta
 import re
 import sys
 
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
 }
 
+def extract_activity_text(html):
+    """Returns the "活動動態" text of a detail page, or None if it has no maincontent div."""
+    soup = BeautifulSoup(html, 'html.parser')
+    
+    # Extract content from <div class="maincontent">
+    content_div = soup.find('div', class_='maincontent')
+    if not content_div:
+        return None
+
+    # Get all text, but try to find the "Activity Dynamic" part
+    # Based on the sample: 
+    # <p>二、活動動態：<br />迄0600時止...</p>
+    full_text = content_div.get_text(separator='\n', strip=True)
+    
+    # The sample shows:
+    # 一、日期：...
+    # 二、活動動態：...
+    lines = full_text.split('\n')
+    capture = False
+    captured_lines = []
+    
+    for line in lines:
+        if "活動動態" in line:
+            capture = True
+            # Remove the header itself if it's on the same line
+            # e.g. "二、活動動態：迄0600時止..." -> "迄0600時止..."
+            # But often it might be "二、活動動態：" then newline.
+            
+            # Split by colon if exists
+            if "：" in line:
+                parts = line.split("：", 1)
+                if len(parts) > 1 and parts[1].strip():
+                    captured_lines.append(parts[1].strip())
+            elif ":" in line:
+                 parts = line.split(":", 1)
+                 if len(parts) > 1 and parts[1].strip():
+                    captured_lines.append(parts[1].strip())
+            continue
+        
+        if capture:
+            # You might want to stop if you hit another section "三、" or similar, 
+            # but usually this is the main part.
+            # Images are often at the end.
+            if line.strip() == "":
+                continue
+            captured_lines.append(line.strip())
+    
+    if captured_lines:
+        return "\n".join(captured_lines)
+    # Fallback: if the header wasn't found (maybe different format), take the whole text
+    return full_text
+
 def scrape_detail(row):
     url = row['link']
     publish_date_str = row['date'] # YYYY-MM-DD
@@ -25,87 +74,20 @@ def scrape_detail(row):
         activity_date = publish_date - timedelta(days=1)
         activity_date_str = activity_date.strftime('%Y-%m-%d')
 
-        response = requests.get(url, headers=HEADERS, timeout=10, verify=False)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Extract content from <div class="maincontent">
-        content_div = soup.find('div', class_='maincontent')
+        # Conditional GET: an unchanged page costs a 304 and reuses the cached extraction
+        activity_text = http_cache.fetch(url, parse=extract_activity_text, headers=HEADERS, timeout=10, verify=False)
         
-        if content_div:
-            # Get all text, but try to find the "Activity Dynamic" part
-            # Based on the sample: 
-            # <p>二、活動動態：<br />迄0600時止...</p>
-            
-            full_text = content_div.get_text(separator='\n', strip=True)
-            
-            # Try to extract specifically the text after "活動動態"
-            # Regex to find "Activity Dynamic" or similar headers
-            # Pattern: matches "Activity Dynamic:" or "2. Activity Dynamic:" etc.
-            # Then captures everything until the end or next section if any.
-            
-            # Simple approach: just save the full text for now, but user asked for "Activity Dynamic Text"
-            # Let's try to be smarter.
-            
-            # The sample shows:
-            # 一、日期：...
-            # 二、活動動態：...
-            
-            activity_text = ""
-            lines = full_text.split('\n')
-            capture = False
-            captured_lines = []
-            
-            for line in lines:
-                if "活動動態" in line:
-                    capture = True
-                    # Remove the header itself if it's on the same line
-                    # e.g. "二、活動動態：迄0600時止..." -> "迄0600時止..."
-                    # But often it might be "二、活動動態：" then newline.
-                    
-                    # Split by colon if exists
-                    if "：" in line:
-                        parts = line.split("：", 1)
-                        if len(parts) > 1 and parts[1].strip():
-                            captured_lines.append(parts[1].strip())
-                    elif ":" in line:
-                         parts = line.split(":", 1)
-                         if len(parts) > 1 and parts[1].strip():
-                            captured_lines.append(parts[1].strip())
-                    continue
-                
-                if capture:
-                    # You might want to stop if you hit another section "三、" or similar, 
-                    # but usually this is the main part.
-                    # Images are often at the end.
-                    if line.strip() == "":
-                        continue
-                    captured_lines.append(line.strip())
-            
-            if captured_lines:
-                activity_text = "\n".join(captured_lines)
-            else:
-                # Fallback: if regex didn't work (maybe different format), take the whole text
-                # but maybe strip the "Date:" part if possible.
-                activity_text = full_text
-
-            return {
-                "publish_date": publish_date_str,
-                "activity_date": activity_date_str,
-                "title": row['title'],
-                "link": url,
-                "content": activity_text
-            }
-        else:
+        if activity_text is None:
             print(f"Warning: No content found for {url}")
-            return {
-                "publish_date": publish_date_str,
-                "activity_date": activity_date_str,
-                "title": row['title'],
-                "link": url,
-                "content": "Content not found"
-            }
+            activity_text = "Content not found"
+
+        return {
+            "publish_date": publish_date_str,
+            "activity_date": activity_date_str,
+            "title": row['title'],
+            "link": url,
+            "content": activity_text
+        }
 
     except Exception as e:
         print(f"Error scraping {url}: {e}")
@@ -123,31 +105,23 @@ def main():
 
     print(f"Found {len(rows)} items to scrape.")
     
-    results = []
-    
     # Multi-threading
     # Adjust max_workers as needed. 10 is usually safe for scraping without being too aggressive.
-    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
+    # Each detail is appended to pla_details.jsonl as soon as it is scraped.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor, JsonlWriter('pla_details.jsonl') as writer:
         future_to_row = {executor.submit(scrape_detail, row): row for row in rows}
         
         completed = 0
         for future in concurrent.futures.as_completed(future_to_row):
             data = future.result()
             if data:
-                results.append(data)
+                writer.write(data)
             
             completed += 1
             if completed % 10 == 0:
                 print(f"Progress: {completed}/{len(rows)}")
 
-    # Sort results by activity date (descending)
-    results.sort(key=lambda x: x['activity_date'], reverse=True)
-
-    # Save to JSON
-    with open('pla_details.json', 'w', encoding='utf-8') as f:
-        json.dump(results, f, ensure_ascii=False, indent=4)
-        
-    print(f"Scraping complete. Saved {len(results)} details to pla_details.json")
+    print(f"Scraping complete. Saved {writer.count} details to pla_details.jsonl")
 
 if __name__ == "__main__":
     main()
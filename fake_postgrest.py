@@ -0,0 +1,543 @@
+import os
+import re
+import sys
+import json
+import sqlite3
+import threading
+from urllib.parse import urlsplit, parse_qsl
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for the Supabase REST API (PostgREST), backed by SQLite, for
+# offline end-to-end and load testing of the uploader. Point the scripts at it
+# through the usual configuration:
+#
+#   python fake_postgrest.py [port]                              # default 54321
+#   SUPABASE_URL=http://127.0.0.1:54321 python migrate_to_supabase.py
+#
+# It implements the setup_database.sql schema (pla_activity, pla_flight_events
+# with ON DELETE CASCADE, pla_sync_state, the three rollup views and the
+# refresh_pla_rollups and upsert_pla_batch RPCs) and the part of PostgREST the
+# scripts and the dashboard use: select with column lists and embedded
+# pla_flight_events, eq/neq/gt/gte/lt/lte/like/in/is filters (and not.), order,
+# limit/offset, POST with on_conflict + Prefer: resolution=merge-duplicates|
+# ignore-duplicates, return=representation|minimal, count=exact, PATCH and
+# DELETE. The API key (and so the service_role-only grants) is not checked.
+DB_FILE = os.environ.get("FAKE_POSTGREST_DB", "fake_postgrest.sqlite")
+DEFAULT_PORT = 54321
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pla_activity (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+  activity_date TEXT UNIQUE NOT NULL,
+  publish_date TEXT,
+  link TEXT,
+  aircraft_total INTEGER DEFAULT 0,
+  aircraft_crossing INTEGER DEFAULT 0,
+  vessels_total INTEGER DEFAULT 0,
+  official_ships_total INTEGER DEFAULT 0,
+  balloons_total INTEGER DEFAULT 0,
+  original_text TEXT,
+  image_file TEXT
+);
+CREATE TABLE IF NOT EXISTS pla_flight_events (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  activity_id INTEGER REFERENCES pla_activity(id) ON DELETE CASCADE,
+  activity_date TEXT,
+  link TEXT,
+  time_range TEXT,
+  aircraft_type TEXT,
+  count INTEGER DEFAULT 0,
+  details TEXT
+);
+CREATE TABLE IF NOT EXISTS pla_sync_state (
+  id TEXT PRIMARY KEY,
+  publish_date TEXT,
+  link_id INTEGER,
+  updated_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+);
+CREATE INDEX IF NOT EXISTS idx_pla_activity_publish_date ON pla_activity(publish_date);
+CREATE INDEX IF NOT EXISTS idx_pla_flight_events_date ON pla_flight_events(activity_date);
+CREATE INDEX IF NOT EXISTS idx_pla_flight_events_type ON pla_flight_events(aircraft_type);
+CREATE INDEX IF NOT EXISTS idx_pla_flight_events_activity_id ON pla_flight_events(activity_id);
+
+-- Rollups: plain views here, so refresh_pla_rollups has nothing to do
+CREATE VIEW IF NOT EXISTS pla_rollup_weekly AS
+SELECT date(activity_date, '-6 days', 'weekday 1') AS period, count(*) AS days,
+       sum(aircraft_total) AS aircraft_total, sum(aircraft_crossing) AS aircraft_crossing,
+       sum(vessels_total) AS vessels_total, sum(official_ships_total) AS official_ships_total,
+       sum(balloons_total) AS balloons_total
+FROM pla_activity GROUP BY 1;
+CREATE VIEW IF NOT EXISTS pla_rollup_monthly AS
+SELECT strftime('%Y-%m-01', activity_date) AS period, count(*) AS days,
+       sum(aircraft_total) AS aircraft_total, sum(aircraft_crossing) AS aircraft_crossing,
+       sum(vessels_total) AS vessels_total, sum(official_ships_total) AS official_ships_total,
+       sum(balloons_total) AS balloons_total
+FROM pla_activity GROUP BY 1;
+CREATE VIEW IF NOT EXISTS pla_window_kpis AS
+WITH windows(window_days) AS (VALUES (7), (30), (90), (0)),
+ranked AS (SELECT a.*, row_number() OVER (ORDER BY activity_date DESC) AS rn FROM pla_activity a),
+scoped AS (SELECT w.window_days, r.* FROM windows w JOIN ranked r ON w.window_days = 0 OR r.rn <= w.window_days),
+totals AS (
+  SELECT window_days, count(*) AS days,
+         sum(aircraft_total) AS aircraft_total, sum(aircraft_crossing) AS aircraft_crossing,
+         sum(vessels_total) AS vessels_total, sum(official_ships_total) AS official_ships_total,
+         sum(balloons_total) AS balloons_total
+  FROM scoped GROUP BY window_days
+),
+peaks AS (
+  SELECT window_days, max_day, max_date FROM (
+    SELECT window_days, aircraft_total AS max_day, activity_date AS max_date,
+           row_number() OVER (PARTITION BY window_days ORDER BY aircraft_total DESC, activity_date ASC) AS k
+    FROM scoped WHERE aircraft_total > 0) WHERE k = 1
+),
+typed AS (
+  SELECT s.window_days, e.count,
+         CASE WHEN lower(e.aircraft_type) LIKE '%fighter%' OR e.aircraft_type LIKE '%主戰%' THEN 0
+              WHEN lower(e.aircraft_type) LIKE '%support%' OR e.aircraft_type LIKE '%輔戰%' THEN 1
+              WHEN lower(e.aircraft_type) LIKE '%uav%' OR e.aircraft_type LIKE '%無人%' THEN 2
+              WHEN lower(e.aircraft_type) LIKE '%heli%' OR e.aircraft_type LIKE '%直升%' THEN 3
+         END AS bucket
+  FROM scoped s JOIN pla_flight_events e ON e.activity_id = s.id
+),
+composition AS (
+  SELECT window_days,
+         sum(count) FILTER (WHERE bucket = 0) AS comp_0, sum(count) FILTER (WHERE bucket = 1) AS comp_1,
+         sum(count) FILTER (WHERE bucket = 2) AS comp_2, sum(count) FILTER (WHERE bucket = 3) AS comp_3,
+         sum(count) AS composition_total
+  FROM typed GROUP BY window_days
+)
+SELECT w.window_days, coalesce(t.days, 0) AS days,
+       coalesce(t.aircraft_total, 0) AS aircraft_total, coalesce(t.aircraft_crossing, 0) AS aircraft_crossing,
+       coalesce(t.vessels_total, 0) AS vessels_total, coalesce(t.official_ships_total, 0) AS official_ships_total,
+       coalesce(t.balloons_total, 0) AS balloons_total,
+       coalesce(p.max_day, 0) AS max_day, p.max_date,
+       coalesce(c.comp_0, 0) AS comp_0, coalesce(c.comp_1, 0) AS comp_1,
+       coalesce(c.comp_2, 0) AS comp_2, coalesce(c.comp_3, 0) AS comp_3,
+       coalesce(c.composition_total, 0) AS composition_total
+FROM windows w
+LEFT JOIN totals t USING (window_days)
+LEFT JOIN peaks p USING (window_days)
+LEFT JOIN composition c USING (window_days);
+"""
+
+# Columns stored as JSON text (text[] in Postgres)
+JSON_COLUMNS = {("pla_flight_events", "details")}
+
+# Embeddable relations: (parent, child) -> (parent column, child column, to-many)
+RELATIONS = {
+    ("pla_activity", "pla_flight_events"): ("id", "activity_id", True),
+    ("pla_flight_events", "pla_activity"): ("activity_id", "id", False),
+}
+
+OPERATORS = {"eq": "=", "neq": "<>", "gt": ">", "gte": ">=", "lt": "<", "lte": "<=", "like": "LIKE", "ilike": "LIKE"}
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_columns = {}
+
+
+class ApiError(Exception):
+    def __init__(self, status, code, message):
+        super().__init__(message)
+        self.status = status
+        self.body = {"code": code, "message": message, "details": None, "hint": None}
+
+
+def _connect():
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(DB_FILE, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        with _schema_lock:
+            conn.executescript(SCHEMA)
+            if not _columns:
+                names = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view')")]
+                for name in names:
+                    _columns[name] = [row[1] for row in conn.execute(f"PRAGMA table_info({name})")]
+        _local.conn = conn
+    return conn
+
+
+def columns(table):
+    _connect()
+    if table not in _columns or table.startswith("sqlite_"):
+        raise ApiError(404, "PGRST205", f"Could not find the table 'public.{table}' in the schema cache")
+    return _columns[table]
+
+
+def check_column(table, column):
+    if column not in columns(table):
+        raise ApiError(400, "42703", f"column {table}.{column} does not exist")
+    return column
+
+
+def split_top(text):
+    # Splits on commas outside parentheses
+    parts, depth, current = [], 0, ""
+    for char in text:
+        if char == "," and depth == 0:
+            parts.append(current)
+            current = ""
+            continue
+        depth += (char == "(") - (char == ")")
+        current += char
+    if current:
+        parts.append(current)
+    return [part.strip() for part in parts if part.strip()]
+
+
+def parse_select(table, select):
+    """Returns ([columns], {relation: (columns, embeds)}) for a select= parameter."""
+    cols, embeds = [], {}
+    for item in split_top(select or "*"):
+        match = re.fullmatch(r'(?:\w+:)?(\w+)(?:!\w+)?\((.*)\)', item)
+        if match:
+            relation = match.group(1)
+            if (table, relation) not in RELATIONS:
+                raise ApiError(400, "PGRST200", f"Could not find a relationship between '{table}' and '{relation}'")
+            embeds[relation] = parse_select(relation, match.group(2))
+        elif item == "*":
+            cols.extend(columns(table))
+        else:
+            cols.append(check_column(table, item.split(":")[-1].split("::")[0]))
+    return list(dict.fromkeys(cols)), embeds
+
+
+def _value(text):
+    if len(text) >= 2 and text[0] == text[-1] == '"':
+        return text[1:-1]
+    return text
+
+
+def parse_filters(table, params):
+    """WHERE clause and arguments for the column filters in the query string."""
+    clauses, args = [], []
+    for column, expression in params:
+        if column in ("select", "order", "limit", "offset", "on_conflict", "columns"):
+            continue
+        check_column(table, column)
+        negate = expression.startswith("not.")
+        if negate:
+            expression = expression[4:]
+        op, _, operand = expression.partition(".")
+        if op == "in":
+            values = [_value(v.strip()) for v in split_top(operand.strip()[1:-1])]
+            clause = f'"{column}" IN ({", ".join("?" * len(values))})' if values else "0"
+            args.extend(values)
+        elif op == "is":
+            literal = {"null": "NULL", "true": "1", "false": "0"}.get(operand.lower())
+            if literal is None:
+                raise ApiError(400, "PGRST100", f"unexpected is.{operand}")
+            clause = f'"{column}" IS {literal}'
+        elif op in OPERATORS:
+            value = _value(operand)
+            if op in ("like", "ilike"):
+                value = value.replace("*", "%")
+            clause = f'"{column}" {OPERATORS[op]} ?'
+            args.append(value)
+        else:
+            raise ApiError(400, "PGRST100", f"unsupported operator '{op}'")
+        clauses.append(f"NOT ({clause})" if negate else clause)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+
+def parse_order(table, order):
+    terms = []
+    for term in split_top(order or ""):
+        column, *modifiers = term.split(".")
+        check_column(table, column)
+        sql = f'"{column}" {"DESC" if "desc" in modifiers else "ASC"}'
+        if "nullsfirst" in modifiers:
+            sql += " NULLS FIRST"
+        elif "nullslast" in modifiers:
+            sql += " NULLS LAST"
+        terms.append(sql)
+    return (" ORDER BY " + ", ".join(terms)) if terms else ""
+
+
+def decode_row(table, cols, values):
+    row = dict(zip(cols, values))
+    for column in cols:
+        if (table, column) in JSON_COLUMNS and row[column] is not None:
+            row[column] = json.loads(row[column])
+    return row
+
+
+def embed(conn, table, rows, embeds):
+    """Attaches the embedded relations to `rows` (which carry their join columns)."""
+    for relation, (cols, nested) in embeds.items():
+        parent_col, child_col, many = RELATIONS[(table, relation)]
+        keys = list({row[parent_col] for row in rows if row.get(parent_col) is not None})
+        fetch = list(dict.fromkeys(cols + [child_col] + [RELATIONS[(relation, r)][0] for r in nested]))
+        children = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            sql = (f'SELECT {", ".join(f"{chr(34)}{c}{chr(34)}" for c in fetch)} FROM "{relation}" '
+                   f'WHERE "{child_col}" IN ({", ".join("?" * len(chunk))}) ORDER BY rowid')
+            for values in conn.execute(sql, chunk):
+                child = decode_row(relation, fetch, values)
+                children.setdefault(child[child_col], []).append(child)
+        all_children = [child for group in children.values() for child in group]
+        embed(conn, relation, all_children, nested)
+        for child in all_children:
+            for column in fetch:
+                if column not in cols and column not in nested:
+                    child.pop(column, None)
+        for row in rows:
+            group = children.get(row.get(parent_col), [])
+            row[relation] = group if many else (group[0] if group else None)
+
+
+def select_rows(conn, table, params, limit_rows=True):
+    query = dict(params)
+    cols, embeds = parse_select(table, query.get("select"))
+    fetch = list(dict.fromkeys(cols + [RELATIONS[(table, r)][0] for r in embeds]))
+    where, args = parse_filters(table, params)
+    sql = f'SELECT {", ".join(f"{chr(34)}{c}{chr(34)}" for c in fetch)} FROM "{table}"{where}{parse_order(table, query.get("order"))}'
+    if limit_rows and ("limit" in query or "offset" in query):
+        sql += f" LIMIT {int(query.get('limit', -1))} OFFSET {int(query.get('offset', 0))}"
+    rows = [decode_row(table, fetch, values) for values in conn.execute(sql, args)]
+    embed(conn, table, rows, embeds)
+    for row in rows:
+        for column in fetch:
+            if column not in cols:
+                row.pop(column, None)
+    return rows, where, args
+
+
+def project(table, rows, params):
+    """Applies select= to rows returned by a write."""
+    query = dict(params)
+    if not query.get("select"):
+        return rows
+    cols, _ = parse_select(table, query["select"])
+    return [{column: row.get(column) for column in cols} for row in rows]
+
+
+def encode(table, column, value):
+    if (table, column) in JSON_COLUMNS and value is not None:
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+def insert_rows(conn, table, body, params, prefer):
+    query = dict(params)
+    rows = body if isinstance(body, list) else [body]
+    if not rows:
+        return []
+    conflict = query.get("on_conflict")
+    if conflict:
+        for column in conflict.split(","):
+            check_column(table, column)
+    resolution = prefer.get("resolution")
+    returned = []
+    all_columns = columns(table)
+    for row in rows:
+        cols = [check_column(table, column) for column in row]
+        sql = f'INSERT INTO "{table}" ({", ".join(f"{chr(34)}{c}{chr(34)}" for c in cols)}) VALUES ({", ".join("?" * len(cols))})'
+        if not cols:
+            sql = f'INSERT INTO "{table}" DEFAULT VALUES'
+        target = conflict or "id"
+        if resolution == "merge-duplicates":
+            updates = [c for c in cols if c not in target.split(",")]
+            sql += f" ON CONFLICT ({target}) DO " + (
+                "UPDATE SET " + ", ".join(f'"{c}" = excluded."{c}"' for c in updates) if updates else "NOTHING")
+        elif resolution == "ignore-duplicates":
+            sql += f" ON CONFLICT ({target}) DO NOTHING"
+        sql += " RETURNING *"
+        try:
+            result = conn.execute(sql, [encode(table, c, row[c]) for c in cols]).fetchall()
+        except sqlite3.IntegrityError as e:
+            if "UNIQUE" in str(e):
+                raise ApiError(409, "23505", f"duplicate key value violates unique constraint ({e})")
+            raise ApiError(409, "23503", str(e))
+        returned.extend(decode_row(table, all_columns, values) for values in result)
+    return returned
+
+
+def parse_prefer(header):
+    prefer = {}
+    for part in (header or "").split(","):
+        key, _, value = part.strip().partition("=")
+        if key:
+            prefer[key] = value
+    return prefer
+
+
+def rpc_refresh_pla_rollups(conn, body):
+    # The rollups are plain views here: nothing to refresh
+    return None
+
+
+def rpc_upsert_pla_batch(conn, body):
+    """Activity rows upserted, their old events replaced by the new ones, in the caller's transaction."""
+    activity_columns = columns("pla_activity")
+    ids = []
+    for record in (body or {}).get("records") or []:
+        row = {column: value for column, value in record.items() if column in activity_columns}
+        activity = insert_rows(conn, "pla_activity", row, [("on_conflict", "activity_date")],
+                               {"resolution": "merge-duplicates"})[0]
+        conn.execute("DELETE FROM pla_flight_events WHERE activity_id = ?", [activity["id"]])
+        insert_rows(conn, "pla_flight_events", [{
+            "activity_id": activity["id"], "activity_date": activity["activity_date"], "link": activity["link"],
+            "time_range": event.get("time_range"), "aircraft_type": event.get("aircraft_type"),
+            "count": event.get("count"), "details": event.get("details"),
+        } for event in record.get("events") or []], [], {})
+        ids.append({"activity_date": activity["activity_date"], "id": activity["id"]})
+    return ids
+
+
+# name -> handler(conn, json body): returns the JSON result, or None for a void function
+RPC = {
+    "refresh_pla_rollups": rpc_refresh_pla_rollups,
+    "upsert_pla_batch": rpc_upsert_pla_batch,
+}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes: without this, keep-alive
+    # responses stall ~40ms on Nagle + delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        if os.environ.get("FAKE_POSTGREST_LOG"):
+            super().log_message(format, *args)
+
+    def send_json(self, status, payload=None, headers=None):
+        body = b"" if payload is None else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        if payload is not None:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        if not raw:
+            return None
+        try:
+            return json.loads(raw)
+        except ValueError:
+            raise ApiError(400, "PGRST102", "Empty or invalid json")
+
+    def handle_request(self, method):
+        parts = urlsplit(self.path)
+        params = parse_qsl(parts.query, keep_blank_values=True)
+        prefer = parse_prefer(self.headers.get("Prefer"))
+        match = re.fullmatch(r"/rest/v1/(rpc/)?(\w+)/?", parts.path)
+        if not match:
+            raise ApiError(404, "PGRST125", f"Invalid path {parts.path}")
+        conn = _connect()
+
+        if match.group(1):
+            if match.group(2) not in RPC or method not in ("POST", "GET"):
+                raise ApiError(404, "PGRST202", f"Could not find the function public.{match.group(2)}")
+            body = self.read_body()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = RPC[match.group(2)](conn, body)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            return self.send_json(204) if result is None else self.send_json(200, result)
+
+        table = match.group(2)
+        columns(table)
+        if method == "GET":
+            rows, where, args = select_rows(conn, table, params)
+            headers = {"Content-Range": f"0-{max(0, len(rows) - 1)}/*" if rows else "*/*"}
+            if prefer.get("count") == "exact":
+                total = conn.execute(f'SELECT count(*) FROM "{table}"{where}', args).fetchone()[0]
+                headers["Content-Range"] = headers["Content-Range"].replace("/*", f"/{total}")
+            return self.send_json(200, rows, headers)
+
+        if table.startswith("pla_rollup") or table == "pla_window_kpis":
+            raise ApiError(405, "PGRST", f"cannot {method} a view")
+        body = self.read_body()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if method == "POST":
+                if body is None:
+                    raise ApiError(400, "PGRST102", "Empty or invalid json")
+                rows = insert_rows(conn, table, body, params, prefer)
+                status = 201
+            elif method == "PATCH":
+                if not isinstance(body, dict) or not body:
+                    raise ApiError(400, "PGRST102", "Empty or invalid json")
+                where, args = parse_filters(table, params)
+                sets = ", ".join(f'"{check_column(table, c)}" = ?' for c in body)
+                result = conn.execute(f'UPDATE "{table}" SET {sets}{where} RETURNING *',
+                                      [encode(table, c, v) for c, v in body.items()] + args).fetchall()
+                rows = [decode_row(table, columns(table), values) for values in result]
+                status = 200
+            elif method == "DELETE":
+                where, args = parse_filters(table, params)
+                result = conn.execute(f'DELETE FROM "{table}"{where} RETURNING *', args).fetchall()
+                rows = [decode_row(table, columns(table), values) for values in result]
+                status = 200
+            else:
+                raise ApiError(405, "PGRST", f"method {method} not allowed")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        if prefer.get("return") == "representation":
+            return self.send_json(status, project(table, rows, params))
+        return self.send_json(201 if method == "POST" else 204)
+
+    def dispatch(self, method):
+        try:
+            self.handle_request(method)
+        except ApiError as e:
+            self.send_json(e.status, e.body)
+        except (ValueError, sqlite3.Error) as e:
+            self.send_json(400, {"code": "PGRST100", "message": str(e), "details": None, "hint": None})
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def do_PATCH(self):
+        self.dispatch("PATCH")
+
+    def do_DELETE(self):
+        self.dispatch("DELETE")
+
+
+def serve(port=DEFAULT_PORT, host="127.0.0.1"):
+    """Starts the server on a background thread. Returns it (server.server_port has the port; shutdown() stops it)."""
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-postgrest", daemon=True).start()
+    return server
+
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PORT
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    print(f"Fake PostgREST on http://127.0.0.1:{port} (database {DB_FILE}). "
+          f"Use SUPABASE_URL=http://127.0.0.1:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import os
+import json
+import hashlib
+import http_client
+
+# On-disk conditional-GET cache. Each URL gets a <sha>.json (validators plus
+# whatever parsers extracted from it) and a <sha>.body (raw response bytes).
+CACHE_DIR = os.environ.get("HTTP_CACHE_DIR", "http_cache")
+
+
+def _paths(url):
+    key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+    folder = os.path.join(CACHE_DIR, key[:2])
+    return folder, os.path.join(folder, f"{key}.json"), os.path.join(folder, f"{key}.body")
+
+
+def _load_meta(meta_path):
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _write_atomic(path, data, mode):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, mode, **({} if 'b' in mode else {'encoding': 'utf-8'})) as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _parser_name(parse):
+    return f"{parse.__module__}.{parse.__qualname__}"
+
+
+def fetch(url, parse=None, headers=None, **kwargs):
+    """
+    GETs `url` through the cache and returns parse(body), or the raw bytes if no parser is given.
+
+    Cached validators are sent as If-None-Match / If-Modified-Since. On a 304,
+    or a 200 whose body hashes to what we already have, the stored body is
+    reused and the parser's previous (JSON-serializable) result is returned
+    without running it again.
+    """
+    folder, meta_path, body_path = _paths(url)
+    meta = _load_meta(meta_path)
+    if meta and not os.path.exists(body_path):
+        meta = None
+
+    request_headers = dict(headers or {})
+    if meta:
+        if meta.get('etag'):
+            request_headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            request_headers['If-Modified-Since'] = meta['last_modified']
+
+    resp = http_client.get(url, headers=request_headers, **kwargs)
+
+    if resp.status_code == 304 and meta:
+        unchanged = True
+        body = None
+    else:
+        resp.raise_for_status()
+        body = resp.content
+        digest = hashlib.sha256(body).hexdigest()
+        unchanged = bool(meta) and meta.get('sha256') == digest
+        if not unchanged:
+            meta = {'url': url, 'sha256': digest, 'parsed': {}}
+            os.makedirs(folder, exist_ok=True)
+            _write_atomic(body_path, body, 'wb')
+        meta['etag'] = resp.headers.get('ETag')
+        meta['last_modified'] = resp.headers.get('Last-Modified')
+
+    name = _parser_name(parse) if parse else None
+    if unchanged and (not parse or name in meta['parsed']):
+        if body is None and not parse:
+            with open(body_path, 'rb') as f:
+                body = f.read()
+        result = meta['parsed'][name] if parse else body
+    else:
+        if body is None:
+            with open(body_path, 'rb') as f:
+                body = f.read()
+        result = parse(body) if parse else body
+        if parse:
+            meta['parsed'][name] = result
+
+    _write_atomic(meta_path, json.dumps(meta, ensure_ascii=False), 'w')
+    return result
@@ -0,0 +1,104 @@
+import threading
+from urllib.parse import urlsplit
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+# Max simultaneous requests (and pooled keep-alive connections) per host.
+DEFAULT_HOST_LIMIT = 8
+HOST_LIMITS = {
+    "www.mnd.gov.tw": 4,
+}
+
+DEFAULT_TIMEOUT = 15
+
+# Retry connection failures, read timeouts and 5xx answers with exponential
+# backoff (0.5s, 1s, 2s). Non-idempotent POSTs are only retried when the
+# connection could not be established at all.
+RETRY = Retry(
+    total=3,
+    connect=3,
+    read=2,
+    status=3,
+    backoff_factor=0.5,
+    status_forcelist=[500, 502, 503, 504],
+    allowed_methods=frozenset(["HEAD", "GET", "OPTIONS", "PUT", "DELETE"]),
+    raise_on_status=False,
+)
+
+_sessions = {}
+_limits = {}
+_lock = threading.Lock()
+
+
+def _host_key(url):
+    parts = urlsplit(url)
+    return parts.scheme, parts.netloc
+
+
+def get_session(url):
+    """Returns the shared keep-alive session (and its concurrency semaphore) for the host of `url`."""
+    key = _host_key(url)
+    with _lock:
+        if key not in _sessions:
+            limit = HOST_LIMITS.get(key[1], DEFAULT_HOST_LIMIT)
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=limit, max_retries=RETRY)
+            session.mount(f"{key[0]}://", adapter)
+            _sessions[key] = session
+            _limits[key] = threading.BoundedSemaphore(limit)
+        return _sessions[key], _limits[key]
+
+
+def request(method, url, **kwargs):
+    session, limit = get_session(url)
+    kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+    with limit:
+        return session.request(method, url, **kwargs)
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
+
+
+def download(url, chunk_size=64 * 1024, **kwargs):
+    """
+    GETs `url` and streams the body into a single buffer (sized from
+    Content-Length when the server sends it), so a large body is never held
+    twice as chunks plus their join. Returns (response, memoryview of the
+    body); the response's own content is not read.
+    """
+    session, limit = get_session(url)
+    kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+    with limit:
+        resp = session.get(url, stream=True, **kwargs)
+        try:
+            try:
+                buf = bytearray(int(resp.headers.get('Content-Length') or 0))
+            except ValueError:
+                buf = bytearray()
+            filled = 0
+            for chunk in resp.iter_content(chunk_size):
+                end = filled + len(chunk)
+                if end > len(buf):
+                    buf.extend(bytes(end - len(buf)))
+                buf[filled:end] = chunk
+                filled = end
+        finally:
+            resp.close()
+    return resp, memoryview(buf)[:filled]
+
+
+def close_all():
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+        _limits.clear()
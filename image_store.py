@@ -0,0 +1,218 @@
+import os
+import io
+import json
+import glob
+import hashlib
+import threading
+import concurrent.futures
+from PIL import Image
+
+# Content-addressed image store.
+# New images are written once per content hash to images/blobs/<sha[:2]>/<sha>.<ext>;
+# images/index.json maps each activity_date to the hash, format, dimensions,
+# source URL and the file (relative to images/) that holds the bytes.
+IMAGE_DIR = "images"
+INDEX_FILE = os.path.join(IMAGE_DIR, "index.json")
+
+FORMAT_EXT = {"JPEG": ".jpg", "PNG": ".png", "GIF": ".gif", "WEBP": ".webp"}
+
+_index = None
+_by_hash = None
+_lock = threading.RLock()
+# Background writer for put_async (one thread: writes and index saves stay ordered)
+_writer = None
+_pending = []
+
+
+def _load():
+    global _index, _by_hash
+    if _index is None:
+        try:
+            with open(INDEX_FILE, 'r', encoding='utf-8') as f:
+                _index = json.load(f)
+        except FileNotFoundError:
+            _index = {}
+        _by_hash = {}
+        for entry in _index.values():
+            _by_hash.setdefault(entry['sha256'], entry)
+    return _index
+
+
+def _save():
+    os.makedirs(IMAGE_DIR, exist_ok=True)
+    tmp = f"{INDEX_FILE}.{os.getpid()}.tmp"
+    # One entry per line keeps the file small and its git diffs readable
+    lines = [f"{json.dumps(date_str)}: {json.dumps(entry, ensure_ascii=False, sort_keys=True, separators=(',', ':'))}"
+             for date_str, entry in sorted(_index.items())]
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write("{\n" + ",\n".join(lines) + "\n}\n")
+    os.replace(tmp, INDEX_FILE)
+
+
+def load_index():
+    """Returns a copy of the date -> entry index."""
+    with _lock:
+        return dict(_load())
+
+
+def lookup(date_str):
+    """Returns the index entry for an activity date, or None if no image is stored."""
+    with _lock:
+        return _load().get(date_str)
+
+
+def lookup_hash(sha256):
+    with _lock:
+        _load()
+        return _by_hash.get(sha256)
+
+
+def path_for(entry):
+    return os.path.join(IMAGE_DIR, entry['file'])
+
+
+class BufferReader(io.RawIOBase):
+    """Seekable read-only file over a bytes-like object; reads copy straight out of it, the buffer itself never."""
+
+    def __init__(self, data):
+        self._view = memoryview(data).cast('B')
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        n = min(len(b), len(self._view) - self._pos)
+        if n <= 0:
+            return 0
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._view)}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+
+def open_image(data):
+    """Opens in-memory image bytes (bytes, bytearray or memoryview) with PIL, without copying them."""
+    return Image.open(io.BufferedReader(BufferReader(data)))
+
+
+def describe(data):
+    """Returns (format, width, height) from the image header."""
+    with open_image(data) as img:
+        return img.format, img.width, img.height
+
+
+def entry_for(data, source_url=None):
+    """The index entry `data` gets (or already has) in the store, without writing anything."""
+    sha = hashlib.sha256(data).hexdigest()
+    existing = lookup_hash(sha)
+    if existing:
+        return dict(existing, source_url=source_url or existing.get('source_url'))
+    fmt, width, height = describe(data)
+    rel = os.path.join("blobs", sha[:2], sha + FORMAT_EXT.get(fmt, ".bin")).replace(os.sep, '/')
+    return {"sha256": sha, "format": fmt, "width": width, "height": height, "source_url": source_url, "file": rel}
+
+
+def put(date_str, data, source_url=None):
+    """
+    Stores image bytes for an activity date and returns its index entry.
+
+    Bytes already present under another date are not written again; the new
+    date simply points at the existing file.
+    """
+    return _write(date_str, entry_for(data, source_url), data)
+
+
+def _write(date_str, entry, data):
+    # Stores `data` under its precomputed entry (entry_for) and points the date at it
+    with _lock:
+        index = _load()
+        existing = _by_hash.get(entry['sha256'])
+        if existing:
+            entry = dict(existing, source_url=entry.get('source_url') or existing.get('source_url'))
+        else:
+            path = os.path.join(IMAGE_DIR, entry['file'])
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp = f"{path}.{os.getpid()}.tmp"
+                with open(tmp, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            _by_hash[entry['sha256']] = entry
+        if index.get(date_str) != entry:
+            index[date_str] = entry
+            _save()
+        return entry
+
+
+def put_async(date_str, data, source_url=None):
+    """
+    Like put, but returns the entry at once and leaves the file and index
+    writes to a background thread (call flush() before relying on them).
+    `data` must not change afterwards.
+    """
+    global _writer
+    entry = entry_for(data, source_url)
+    with _lock:
+        if _writer is None:
+            _writer = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='image-store')
+        # The writer reuses the entry: the bytes are hashed and decoded once
+        _pending.append(_writer.submit(_write, date_str, entry, data))
+    return entry
+
+
+def flush():
+    """Waits for the put_async writes so far. Returns how many failed (each is reported)."""
+    with _lock:
+        pending = list(_pending)
+        _pending.clear()
+    failed = 0
+    for future in pending:
+        try:
+            future.result()
+        except Exception as e:
+            print(f"Error storing image: {e}")
+            failed += 1
+    return failed
+
+
+def import_legacy():
+    """Indexes the date-named files already in images/ in place (first file wins for duplicate content)."""
+    with _lock:
+        index = _load()
+        added = 0
+        for path in sorted(glob.glob(os.path.join(IMAGE_DIR, "*.*"))):
+            filename = os.path.basename(path)
+            date_str, ext = os.path.splitext(filename)
+            if ext.lower() not in ('.jpg', '.jpeg', '.png', '.gif') or date_str in index:
+                continue
+            with open(path, 'rb') as f:
+                data = f.read()
+            sha = hashlib.sha256(data).hexdigest()
+            entry = _by_hash.get(sha)
+            if not entry:
+                fmt, width, height = describe(data)
+                entry = {"sha256": sha, "format": fmt, "width": width, "height": height,
+                         "source_url": None, "file": filename}
+                _by_hash[sha] = entry
+            index[date_str] = entry
+            added += 1
+        if added:
+            _save()
+        return added
+
+
+if __name__ == "__main__":
+    count = import_legacy()
+    index = load_index()
+    print(f"Indexed {count} legacy images. {len(index)} dates -> {len({e['sha256'] for e in index.values()})} unique images.")
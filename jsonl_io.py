@@ -0,0 +1,61 @@
+import os
+import json
+
+# Stage I/O: one JSON object per line. Writers flush every record, so a run
+# that dies half-way keeps everything it produced; readers are generators, so
+# memory does not grow with the size of the history.
+
+
+def _iter_legacy(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        yield from json.load(f)
+
+
+def _iter_jsonl(f):
+    with f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def read_records(path):
+    """
+    Returns a generator over the records of a .jsonl file.
+
+    If only the legacy pretty-printed array (same name, .json) exists, it is
+    read instead so older archives keep working. A missing file raises
+    FileNotFoundError here, before any downstream writer has been opened.
+    """
+    if not os.path.exists(path) and path.endswith('.jsonl') and os.path.exists(path[:-1]):
+        return _iter_legacy(path[:-1])
+    return _iter_jsonl(open(path, 'r', encoding='utf-8'))
+
+
+class JsonlWriter:
+    def __init__(self, path, append=False):
+        self.path = path
+        self.count = 0
+        self.f = open(path, 'a' if append else 'w', encoding='utf-8')
+
+    def write(self, record):
+        self.f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.f.flush()
+        self.count += 1
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_records(path, records, append=False):
+    """Streams an iterable of records to a .jsonl file and returns how many were written."""
+    with JsonlWriter(path, append=append) as writer:
+        for record in records:
+            writer.write(record)
+        return writer.count
@@ -0,0 +1,110 @@
+import os
+import time
+import threading
+import concurrent.futures
+from bs4 import BeautifulSoup
+import http_client
+
+BASE_URL = "https://www.mnd.gov.tw"
+LIST_URL_TEMPLATE = "https://www.mnd.gov.tw/news/plaactlist/{}"
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+    "Accept-Language": "zh-TW,zh;q=0.9,en-US;q=0.8,en;q=0.7",
+}
+
+# Crawl tuning: how many list pages may be in flight at once, and the
+# sustained request rate (requests/second) we allow ourselves against mnd.gov.tw.
+CRAWL_CONCURRENCY = int(os.environ.get("CRAWL_CONCURRENCY", "4"))
+CRAWL_RATE = float(os.environ.get("CRAWL_RATE", "2.0"))
+CRAWL_BURST = int(os.environ.get("CRAWL_BURST", "4"))
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens/second, at most `capacity` saved up."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def parse_list_page(html):
+    """Returns the bulletins on one list page as dicts with roc_date, title and absolute link."""
+    soup = BeautifulSoup(html, 'html.parser')
+    items = []
+    for item in soup.find_all('a', class_='news_list'):
+        date_tag = item.find('h5', class_='date')
+        if not date_tag:
+            continue
+        link = item.get('href')
+        if link and not link.startswith('http'):
+            link = BASE_URL + '/' + link.lstrip('/')
+        title_tag = item.find('h4', class_='title')
+        items.append({
+            'roc_date': date_tag.get_text(strip=True),
+            'title': title_tag.get_text(strip=True) if title_tag else "No Title",
+            'link': link
+        })
+    return items
+
+
+def fetch_list_page(bucket, page):
+    bucket.acquire()
+    resp = http_client.get(LIST_URL_TEMPLATE.format(page), headers=HEADERS, timeout=10, verify=False)
+    resp.raise_for_status()
+    return parse_list_page(resp.text)
+
+
+def crawl_list_pages(concurrency=None, rate=None, burst=None, max_pages=None):
+    """
+    Yields (page, items) for list pages 1, 2, 3... strictly in page order.
+
+    Up to `concurrency` pages are fetched speculatively ahead of the consumer,
+    throttled by a shared token bucket. The consumer decides when to stop simply
+    by breaking out of the loop; pages still in flight are then cancelled.
+    Crawling also ends at the first empty page or the first failed request.
+    """
+    concurrency = max(1, concurrency or CRAWL_CONCURRENCY)
+    bucket = TokenBucket(rate or CRAWL_RATE, burst or CRAWL_BURST)
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=concurrency)
+    pending = {}
+    next_to_submit = 1
+    page = 1
+    try:
+        while max_pages is None or page <= max_pages:
+            # Keep the look-ahead window full
+            while len(pending) < concurrency and (max_pages is None or next_to_submit <= max_pages):
+                pending[next_to_submit] = executor.submit(fetch_list_page, bucket, next_to_submit)
+                next_to_submit += 1
+
+            future = pending.pop(page)
+            try:
+                items = future.result()
+            except Exception as e:
+                print(f"Error fetching list page {page}: {e}")
+                return
+            if not items:
+                return
+            yield page, items
+            page += 1
+    finally:
+        for future in pending.values():
+            future.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
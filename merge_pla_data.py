@@ -1,26 +1,7 @@
-import json
-
-def merge_data():
-    file_analysis = 'pla_analysis.json'
-    file_ocr = 'ocr_cleaned.json'
-    output_file = 'merged_pla_data.json'
-
-    # Load data
-    try:
-        with open(file_analysis, 'r', encoding='utf-8') as f:
-            analysis_data = json.load(f)
-        with open(file_ocr, 'r', encoding='utf-8') as f:
-            ocr_data = json.load(f)
-    except FileNotFoundError as e:
-        print(f"Error loading files: {e}")
-        return
-
-    # Create a lookup dictionary for OCR data based on date
-    # ocr_cleaned.json uses 'date', pla_analysis.json uses 'activity_date'
-    ocr_map = {item['date']: item for item in ocr_data}
-
-    merged_list = []
+from jsonl_io import read_records, write_records
 
+def merge_records(analysis_data, ocr_map):
+    """Generator stage: joins pla_analysis records with cleaned OCR events by activity date."""
     for entry in analysis_data:
         date_key = entry.get('activity_date')
         
@@ -49,13 +30,26 @@ def merge_data():
             merged_entry['events'] = []
             merged_entry['image_file'] = None
 
-        merged_list.append(merged_entry)
+        yield merged_entry
+
+def merge_data():
+    file_analysis = 'pla_analysis.jsonl'
+    file_ocr = 'ocr_cleaned.jsonl'
+    output_file = 'merged_pla_data.jsonl'
+
+    # Load data
+    try:
+        analysis_data = read_records(file_analysis)
+        # Only the OCR side is held in memory, as a lookup keyed by date;
+        # ocr_cleaned uses 'date', pla_analysis uses 'activity_date'
+        ocr_map = {item['date']: item for item in read_records(file_ocr)}
+    except FileNotFoundError as e:
+        print(f"Error loading files: {e}")
+        return
 
-    # Save merged data
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(merged_list, f, ensure_ascii=False, indent=4)
+    count = write_records(output_file, merge_records(analysis_data, ocr_map))
 
-    print(f"Merge complete. Saved {len(merged_list)} records to {output_file}.")
+    print(f"Merge complete. Saved {count} records to {output_file}.")
 
 if __name__ == "__main__":
     merge_data()
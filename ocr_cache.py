@@ -0,0 +1,77 @@
+import os
+import json
+import sqlite3
+import threading
+
+# Persistent OCR results, keyed by everything that can change Tesseract's output:
+# image content hash, crop rectangle (pixels), language set, config string and
+# Tesseract version. The table region found in each image (ocr_preprocess) is
+# kept alongside, per detector, so a cache hit needs no pixel work at all.
+CACHE_FILE = os.environ.get("OCR_CACHE_FILE", "ocr_cache.sqlite")
+
+_local = threading.local()
+
+
+def _connect():
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(CACHE_FILE, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS ocr_results (
+                sha256 TEXT NOT NULL,
+                crop TEXT NOT NULL,
+                lang TEXT NOT NULL,
+                config TEXT NOT NULL,
+                version TEXT NOT NULL,
+                lines TEXT NOT NULL,
+                confidences TEXT NOT NULL,
+                PRIMARY KEY (sha256, crop, lang, config, version)
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS ocr_regions (
+                sha256 TEXT NOT NULL,
+                detector TEXT NOT NULL,
+                crop TEXT NOT NULL,
+                PRIMARY KEY (sha256, detector)
+            )
+        """)
+        _local.conn = conn
+    return conn
+
+
+def make_key(sha256, crop, lang, config, version):
+    return (sha256, ",".join(str(int(v)) for v in crop), lang, config or "", str(version))
+
+
+def get(key):
+    """Returns (lines, confidences) for a key, or None on a miss."""
+    row = _connect().execute(
+        "SELECT lines, confidences FROM ocr_results WHERE sha256=? AND crop=? AND lang=? AND config=? AND version=?",
+        key).fetchone()
+    if row is None:
+        return None
+    return json.loads(row[0]), json.loads(row[1])
+
+
+def put(key, lines, confidences):
+    conn = _connect()
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO ocr_results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                     key + (json.dumps(lines, ensure_ascii=False), json.dumps(confidences)))
+
+
+def get_region(sha256, detector):
+    """Returns the crop rectangle found for an image by a table detector, or None."""
+    row = _connect().execute("SELECT crop FROM ocr_regions WHERE sha256=? AND detector=?", (sha256, detector)).fetchone()
+    if row is None:
+        return None
+    return tuple(int(v) for v in row[0].split(","))
+
+
+def put_region(sha256, detector, rect):
+    conn = _connect()
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO ocr_regions VALUES (?, ?, ?)",
+                     (sha256, detector, ",".join(str(int(v)) for v in rect)))
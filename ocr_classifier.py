@@ -0,0 +1,126 @@
+import re
+
+# Line classifier for the OCR'd activity table, shared by clean_ocr_data and
+# update_pla_data. The keyword tables below are compiled into one alternation
+# over lowercase keywords, so each line is lower()'d and scanned once instead
+# of being substring-checked per keyword.
+
+# (label, keywords) in output order
+AIRCRAFT_TYPES = [
+    ('主戰機 (Fighter)', ['fighter', '主戰']),
+    ('輔戰機 (Support)', ['support', '輔戰']),
+    ('無人機 (UAV)', ['uav', '無人']),
+    ('直升機 (Helicopter)', ['helicopter', '直升']),
+    ('轟炸機 (Bomber)', ['bomber', '轟炸']),
+]
+
+ACTIVITY_DETAILS = [
+    ('逾越中線 (Crossed Median Line)', ['中線', 'median line']),
+    ('進入西南空域 (Entered SW ADIZ)', ['西南', 'southwest', 'sw']),
+    ('進入東部空域 (Entered East ADIZ)', ['東部', 'east']),
+    ('進入北部空域 (Entered North ADIZ)', ['北部', 'north']),
+]
+
+# Table headers that are not part of any event
+HEADER_LINES = frozenset(['activities', 'no', 'content', '內容'])
+
+# Matches 0810-1245, 0810 - 1245, allowing for some noise at the end
+TIME_RE = re.compile(r'(\d{4})\s*[-~]\s*(\d{4})')
+# Chinese: 5架次, 計5架 / English: 5 sorties, 1 sortie
+COUNT_RE = re.compile(r'(\d+)\s*(?:架次|架|sorties|sortie)')
+# Sometimes OCR puts number at end: 主戰機計5
+COUNT_END_RE = re.compile(r'(?:計|of)\s*(\d+)')
+
+
+def _build(*tables):
+    # keyword -> (kind, position in its table). Longest keywords come first in
+    # the alternation; no keyword ends where another starts, so non-overlapping
+    # matches see the same keywords as one substring test per keyword
+    keywords = {}
+    for kind, table in enumerate(tables):
+        for index, (_, words) in enumerate(table):
+            for word in words:
+                keywords[word.lower()] = (kind, index)
+    alternation = '|'.join(re.escape(word) for word in sorted(keywords, key=len, reverse=True))
+    return re.compile(alternation), keywords
+
+
+KEYWORD_RE, KEYWORDS = _build(AIRCRAFT_TYPES, ACTIVITY_DETAILS)
+
+
+def classify(lowered):
+    """Returns (aircraft type labels, detail labels) mentioned in an already lower()'d line, each in table order."""
+    found = KEYWORD_RE.findall(lowered)
+    if not found:
+        return (), ()
+    hits = ({}, {})
+    for word in found:
+        kind, index = KEYWORDS[word]
+        hits[kind][index] = True
+    return ([AIRCRAFT_TYPES[i][0] for i in sorted(hits[0])],
+            [ACTIVITY_DETAILS[i][0] for i in sorted(hits[1])])
+
+
+def parse_time(line):
+    match = TIME_RE.search(line)
+    return f"{match.group(1)}-{match.group(2)}" if match else None
+
+
+def parse_count(line):
+    match = COUNT_RE.search(line) or COUNT_END_RE.search(line)
+    return int(match.group(1)) if match else None
+
+
+def parse_lines(raw_lines, keep_raw=False, first_type_per_line=False):
+    """
+    Groups OCR lines into events: a time range starts a new event, and the
+    following lines add aircraft types, the first count and ADIZ details.
+    With keep_raw, each event also lists the lines it was built from. With
+    first_type_per_line, a line adds only its first aircraft type in table
+    order, as clean_ocr_data always did; update_pla_data takes every type.
+    """
+    events = []
+    current = None
+    seen_details = set()
+    for line in raw_lines:
+        line = line.strip()
+        lowered = line.lower()
+        if not line or lowered in HEADER_LINES:
+            continue
+
+        time_range = parse_time(line)
+        if time_range:
+            if current:
+                events.append(current)
+            current = {"time": time_range, "aircraft_type": "Unknown", "count": 0, "details": []}
+            if keep_raw:
+                current["raw_lines"] = [line]
+            seen_details = set()
+            continue
+        if not current:
+            continue
+
+        if keep_raw:
+            current["raw_lines"].append(line)
+        types, details = classify(lowered)
+        if first_type_per_line:
+            types = types[:1]
+        for ac_type in types:
+            # A second type (e.g. Fighter then UAV) is appended to the first
+            if current["aircraft_type"] == "Unknown":
+                current["aircraft_type"] = ac_type
+            elif ac_type not in current["aircraft_type"]:
+                current["aircraft_type"] += f", {ac_type}"
+        # The first number after the type is the reliable one; repeats ("5 sorties", "5架次") are ignored
+        if current["count"] == 0:
+            count = parse_count(line)
+            if count is not None:
+                current["count"] = count
+        for detail in details:
+            if detail not in seen_details:
+                seen_details.add(detail)
+                current["details"].append(detail)
+
+    if current:
+        events.append(current)
+    return events
@@ -0,0 +1,222 @@
+import os
+import platform
+import threading
+import ocr_cache
+import ocr_preprocess
+
+# Tesseract Configuration (Cross-Platform)
+try:
+    import pytesseract
+
+    # 1. Try Windows Paths
+    # Users might need to install Tesseract from: https://github.com/UB-Mannheim/tesseract/wiki
+    possible_paths = [
+        r'C:\Program Files\Tesseract-OCR\tesseract.exe',
+        r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
+        r'C:\Users\wason\AppData\Local\Tesseract-OCR\tesseract.exe'
+    ]
+    tesseract_cmd = None
+    for path in possible_paths:
+        if os.path.exists(path):
+            tesseract_cmd = path
+            break
+
+    # 2. Try Linux/Mac Path (GitHub Actions uses /usr/bin/tesseract)
+    if not tesseract_cmd and platform.system() != "Windows":
+        if os.path.exists("/usr/bin/tesseract"):
+            tesseract_cmd = "/usr/bin/tesseract"
+
+    if tesseract_cmd:
+        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
+    # Check if accessible
+    try:
+        PYTESSERACT_VERSION = str(pytesseract.get_tesseract_version())
+    except Exception:
+        PYTESSERACT_VERSION = None
+
+except ImportError:
+    pytesseract = None
+    PYTESSERACT_VERSION = None
+
+# Optional in-process engine (pip install tesserocr): keeps one TessBaseAPI with the
+# traineddata loaded per worker and takes PIL images directly, instead of writing a
+# temp file and forking the tesseract binary for every crop.
+try:
+    import tesserocr
+    TESSEROCR_VERSION = tesserocr.tesseract_version().split('\n')[0]
+except ImportError:
+    tesserocr = None
+    TESSEROCR_VERSION = None
+
+# auto | tesserocr | pytesseract
+OCR_BACKEND = os.environ.get("OCR_BACKEND", "auto")
+
+# Fallback crop area, when the table can't be located (see ocr_preprocess): skip the
+# title and date info (approx top 16%) and focus on the left table.
+# Fractions of (left, top, right, bottom).
+CROP_BOX = (0, 0.16, 0.45, 0.50)
+
+PREFERRED_LANG = 'chi_tra+eng'
+FALLBACK_LANG = 'eng'
+
+_lang = None
+
+
+class PytesseractBackend:
+    """One tesseract subprocess per call; text and line confidences from a single txt+tsv run."""
+    name = 'pytesseract'
+    version = PYTESSERACT_VERSION
+
+    def languages(self):
+        return set(pytesseract.get_languages())
+
+    def recognize(self, img, lang):
+        text, tsv = pytesseract.pytesseract.run_and_get_multiple_output(img, extensions=['txt', 'tsv'], lang=lang)
+        lines = [line.strip() for line in text.split('\n') if line.strip()]
+        confidences = _line_confidences(tsv)
+        if len(confidences) != len(lines):
+            confidences = (confidences + [None] * len(lines))[:len(lines)]
+        return lines, confidences
+
+
+class TesserocrBackend:
+    """Persistent TessBaseAPI handles (one per thread and language set), fed in-memory images."""
+    name = 'tesserocr'
+    version = TESSEROCR_VERSION
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def languages(self):
+        return set(tesserocr.get_languages()[1])
+
+    def handle(self, lang):
+        apis = getattr(self._local, 'apis', None)
+        if apis is None:
+            apis = self._local.apis = {}
+        if lang not in apis:
+            apis[lang] = tesserocr.PyTessBaseAPI(lang=lang)
+        return apis[lang]
+
+    def recognize(self, img, lang):
+        api = self.handle(lang)
+        api.SetImage(img)
+        api.Recognize()
+        lines, confidences = [], []
+        for line in tesserocr.iterate_level(api.GetIterator(), tesserocr.RIL.TEXTLINE):
+            text = (line.GetUTF8Text(tesserocr.RIL.TEXTLINE) or '').strip()
+            if text:
+                lines.append(text)
+                confidences.append(round(line.Confidence(tesserocr.RIL.TEXTLINE), 1))
+        api.Clear()
+        return lines, confidences
+
+
+_backend = None
+
+
+def get_backend():
+    """Returns the OCR backend for this process: tesserocr when installed, pytesseract otherwise."""
+    global _backend
+    if _backend is None:
+        if tesserocr and OCR_BACKEND in ('auto', 'tesserocr'):
+            _backend = TesserocrBackend()
+        elif pytesseract and PYTESSERACT_VERSION and OCR_BACKEND in ('auto', 'pytesseract'):
+            _backend = PytesseractBackend()
+    return _backend
+
+
+TESSERACT_AVAILABLE = get_backend() is not None
+TESSERACT_VERSION = get_backend().version if TESSERACT_AVAILABLE else None
+
+
+def ocr_lang():
+    """Picks the language set once: Chinese Traditional + English if chi_tra is installed, else English."""
+    global _lang
+    if _lang is None:
+        try:
+            installed = get_backend().languages()
+        except Exception:
+            installed = set()
+        _lang = PREFERRED_LANG if 'chi_tra' in installed else FALLBACK_LANG
+    return _lang
+
+
+def worker_count():
+    """Number of OCR worker processes: OCR_WORKERS if set, else the cores available to us."""
+    if os.environ.get("OCR_WORKERS"):
+        return max(1, int(os.environ["OCR_WORKERS"]))
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def init_worker(lang):
+    """
+    Process-pool initializer: reuse the language chosen by the parent instead of
+    probing again. With tesserocr the model is loaded here, once per worker.
+    """
+    global _lang
+    _lang = lang
+    backend = get_backend()
+    if isinstance(backend, TesserocrBackend):
+        backend.handle(lang)
+
+
+def crop_rect(width, height):
+    left, top, right, bottom = CROP_BOX
+    return (round(width * left), round(height * top), round(width * right), round(height * bottom))
+
+
+def _line_confidences(tsv):
+    # Mean word confidence of each text line, in reading order
+    lines = {}
+    for row in tsv.splitlines()[1:]:
+        cols = row.split('\t')
+        if len(cols) < 12 or cols[0] != '5' or not cols[11].strip():
+            continue
+        conf = float(cols[10])
+        if conf < 0:
+            continue
+        lines.setdefault(tuple(cols[1:5]), []).append(conf)
+    return [round(sum(c) / len(c), 1) for c in lines.values()]
+
+
+def ocr_image(img, sha256=None, use_cache=True):
+    """
+    OCRs the events table of a bulletin image and returns (lines, confidences).
+
+    With the image's content hash, results are served from / stored in the
+    persistent OCR cache so an unchanged image is never OCR'd twice. `img`
+    should be freshly opened: it is only decoded on a cache miss, and then
+    straight to grayscale at the resolution OCR needs.
+    """
+    size = img.size
+    gray = None
+    # The events table's crop box, found once per image hash; CROP_BOX if it can't be found
+    rect = ocr_cache.get_region(sha256, ocr_preprocess.DETECTOR) if sha256 and use_cache else None
+    if rect is None:
+        gray = ocr_preprocess.decode(img)
+        rect = ocr_preprocess.detect_table(gray, size) or crop_rect(*size)
+        if sha256:
+            ocr_cache.put_region(sha256, ocr_preprocess.DETECTOR, rect)
+
+    lang = ocr_lang()
+    backend = get_backend()
+    config = f"{backend.name}+{ocr_preprocess.PROFILE}" if ocr_preprocess.PROFILE else backend.name
+    key = ocr_cache.make_key(sha256, rect, lang, config, backend.version) if sha256 else None
+    if key and use_cache:
+        cached = ocr_cache.get(key)
+        if cached is not None:
+            return cached
+
+    # Grayscale (and with numpy, scaled and binarized) crop of the table
+    if gray is None:
+        gray = ocr_preprocess.decode(img)
+    lines, confidences = backend.recognize(ocr_preprocess.prepare(gray, rect, size), lang)
+
+    if key:
+        ocr_cache.put(key, lines, confidences)
+    return lines, confidences
@@ -1,6 +1,7 @@
 import os
-import json
-import glob
+from jsonl_io import JsonlWriter
+import image_store
+import time
 import concurrent.futures
 import sys
 try:
@@ -9,111 +10,90 @@ try:
 except ImportError:
     print("Please install libraries: pip install pytesseract Pillow")
     sys.exit(1)
+import ocr_engine
 
-# Configuration for Tesseract path on Windows (Common locations)
-# Users might need to install Tesseract from: https://github.com/UB-Mannheim/tesseract/wiki
-possible_paths = [
-    r'C:\Program Files\Tesseract-OCR\tesseract.exe',
-    r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
-    r'C:\Users\wason\AppData\Local\Tesseract-OCR\tesseract.exe'
-]
-
-tesseract_cmd = None
-for path in possible_paths:
-    if os.path.exists(path):
-        tesseract_cmd = path
-        break
-
-if tesseract_cmd:
-    pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
-else:
-    # Hope it's in PATH
-    pass
-
-def process_image(img_path):
+def process_image(img_path, date_str=None, sha256=None, use_cache=True):
     try:
         filename = os.path.basename(img_path)
-        date_str = os.path.splitext(filename)[0]
+        if date_str is None:
+            date_str = os.path.splitext(filename)[0]
         
         with Image.open(img_path) as img:
-            width, height = img.size
-            
-            # Crop Area: Adjusted to skip the title (approx top 16%)
-            # Focus on the left table
-            left = 0
-            top = height * 0.16  # Skip title and date info
-            right = width * 0.45 
-            bottom = height * 0.50 # Extend slightly to capture more rows
-            
-            cropped_img = img.crop((left, top, right, bottom))
-            
-            # Convert to grayscale for better OCR
-            cropped_img = cropped_img.convert('L')
-            
-            # Perform OCR
-            # Try to use Chinese Traditional + English
+            # Crop to the events table (located per image), binarize, OCR (chi_tra+eng when installed).
+            # Results are cached by image hash, crop box, preprocessing, language and Tesseract version.
             try:
-                text = pytesseract.image_to_string(cropped_img, lang='chi_tra+eng')
-            except pytesseract.TesseractError:
-                # Fallback to English only if chi_tra is missing
-                try:
-                    text = pytesseract.image_to_string(cropped_img, lang='eng')
-                except Exception as e:
-                    return {"date": date_str, "error": str(e)}
+                lines, confidences = ocr_engine.ocr_image(img, sha256, use_cache=use_cache)
+            except Exception as e:
+                return {"date": date_str, "error": str(e)}
 
-            # Simple parsing of the text to clean it up
-            lines = [line.strip() for line in text.split('\n') if line.strip()]
-            
             return {
                 "date": date_str,
                 "file": filename,
-                "raw_text": lines
+                "raw_text": lines,
+                "confidences": confidences
             }
             
     except Exception as e:
         return {"date": date_str, "error": str(e)}
 
-def main():
-    image_dir = "images"
-    output_file = "ocr_results.json"
-    
-    # Get list of images
-    image_files = glob.glob(os.path.join(image_dir, "*.jpg")) + \
-                  glob.glob(os.path.join(image_dir, "*.png")) + \
-                  glob.glob(os.path.join(image_dir, "*.JPG")) + \
-                  glob.glob(os.path.join(image_dir, "*.PNG"))
+def main(benchmark=False):
+    """OCR every stored image. In benchmark mode the OCR cache is bypassed and only throughput is reported."""
+    output_file = "ocr_results.jsonl"
     
-    print(f"Found {len(image_files)} images to process.")
-    
-    results = []
+    # Get list of images from the content-addressed store; dates that share
+    # identical image bytes are OCR'd once.
+    image_store.import_legacy()
+    dates_by_hash = {}
+    entries = {}
+    for date_str, entry in sorted(image_store.load_index().items()):
+        dates_by_hash.setdefault(entry['sha256'], []).append(date_str)
+        entries[entry['sha256']] = entry
+
+    print(f"Found {len(dates_by_hash)} unique images to process.")
     
+    def add_result(sha, data):
+        for date_str in dates_by_hash[sha]:
+            item = dict(data, date=date_str, sha256=sha)
+            if 'error' not in item:
+                item['file'] = entries[sha]['file']
+            writer.write(item)
+
     # Check if tesseract is available effectively
-    try:
-        pytesseract.get_tesseract_version()
-    except Exception:
+    if not ocr_engine.TESSERACT_AVAILABLE:
         print("Error: Tesseract OCR binary not found.")
         print("Please install Tesseract OCR from https://github.com/UB-Mannheim/tesseract/wiki")
-        print("And ensure it is in your PATH or update the script with the installation path.")
-        # We will still try to run, maybe some workers will fail or all will fail.
-        # But actually if get_version fails, image_to_string will fail too.
-        # Let's stop here to be clear.
+        print("And ensure it is in your PATH or update ocr_engine.py with the installation path.")
         return
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
-        future_to_img = {executor.submit(process_image, img_path): img_path for img_path in image_files}
+    # OCR runs in a process pool sized to the available cores (PIL decode/crop
+    # and result parsing no longer contend on one GIL). The language is probed
+    # once here and handed to every worker.
+    workers = ocr_engine.worker_count()
+    lang = ocr_engine.ocr_lang()
+    print(f"Running OCR with {workers} worker processes (lang={lang}){' in benchmark mode' if benchmark else ''}...")
+
+    started = time.perf_counter()
+    done = 0
+    # Results are appended to the output as they complete (nothing is written in benchmark mode)
+    writer = JsonlWriter(os.devnull if benchmark else output_file)
+    with writer, concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=ocr_engine.init_worker, initargs=(lang,)) as executor:
+        future_to_sha = {executor.submit(process_image, image_store.path_for(entries[sha]), dates_by_hash[sha][0], sha, not benchmark): sha for sha in dates_by_hash}
         
-        for future in concurrent.futures.as_completed(future_to_img):
+        # Stream results as they complete
+        for future in concurrent.futures.as_completed(future_to_sha):
             data = future.result()
+            done += 1
             if data:
-                results.append(data)
+                add_result(future_to_sha[future], data)
+            if done % 25 == 0:
+                print(f"Progress: {done}/{len(future_to_sha)}")
+    elapsed = time.perf_counter() - started
+
+    if benchmark:
+        print(f"Benchmark: {done} images in {elapsed:.2f}s with {workers} workers = {done / elapsed if elapsed else 0:.2f} images/sec")
+        return
                 
-    # Sort by date
-    results.sort(key=lambda x: x.get('date', ''))
-    
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(results, f, ensure_ascii=False, indent=4)
-        
-    print(f"OCR complete. Saved results for {len(results)} images to {output_file}.")
+    print(f"OCR complete. Saved results for {writer.count} images to {output_file}.")
 
 if __name__ == "__main__":
-    main()
+    main(benchmark="--benchmark" in sys.argv)
@@ -0,0 +1,185 @@
+import os
+from PIL import Image
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Image preparation for OCR: find the events table, crop it, scale it to a
+# common text size and binarize it.
+#
+# The bulletins come in several sizes (720x1040 JPEGs, 1125x1625 and smaller
+# RGBA PNGs) and the table's height depends on the number of events, so a
+# fixed fraction of the image either cuts rows off or takes in the map. The
+# table is a ruled box flush with the left edge: its horizontal rules are the
+# rows with a long dark run starting at the left, and the box ends at the
+# last rule that follows the previous one closely. Without numpy (or when no
+# table is found) ocr_engine.CROP_BOX is used as before.
+DETECTOR = "table-v1" if np is not None else "fixed"
+
+# Crops are scaled as if the whole bulletin were this wide, so body text has
+# the same height (about 20px at 1080) whatever the source size.
+TARGET_WIDTH = int(os.environ.get("OCR_TARGET_WIDTH", "1080"))
+PROFILE = f"bin{TARGET_WIDTH}" if np is not None else None
+
+DARK = 160            # gray level below which a pixel is ink / a rule (small PNGs have gray rules)
+DARK_REDUCED = 200    # the same for a DCT-scaled decode, where 1px rules fade to gray
+SEARCH_TOP = 0.08     # the table starts below the title...
+SEARCH_BOTTOM = 0.85  # ...and ends above the scale bar
+RULE_START = 0.10     # rules start within this fraction of the width from the left
+RULE_MIN = 0.15       # and are at least this fraction of the width long
+COVERAGE = 0.9        # share of a rule's pixels that must be dark (JPEG rules have gaps)
+MAX_ROW = 0.25        # no table row is taller than this fraction of the height
+MIN_RULES = 3         # top, header bottom and at least one event row
+PAD = 2
+
+
+def to_gray(img):
+    """Grayscale copy of the image, transparent areas flattened onto white."""
+    if img.mode == 'L':
+        img.load()
+        return img
+    if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+        img = img.convert('RGBA')
+        background = Image.new('RGBA', img.size, (255, 255, 255, 255))
+        img = Image.alpha_composite(background, img)
+    return img.convert('L')
+
+
+def decode_scale(width):
+    """Resolution (fraction of `width`) the OCR input needs: prepare() never scales above TARGET_WIDTH."""
+    if np is None:
+        return 1.0
+    return min(1.0, TARGET_WIDTH / width)
+
+
+def decode(img):
+    """
+    Decodes a freshly opened image to grayscale, at no more resolution than
+    OCR needs. JPEGs use libjpeg's draft mode: the luma plane is decoded
+    straight to 'L' (no chroma upsampling or RGB->L pass) and, where the
+    target allows, DCT-scaled by 1/2, 1/4 or 1/8. The result may be smaller
+    than img.size; detect_table and prepare take the original size.
+    """
+    if img.format == 'JPEG' and img.mode in ('RGB', 'L'):
+        scale = decode_scale(img.width)
+        img.draft('L', (max(1, int(img.width * scale)), max(1, int(img.height * scale))))
+    return to_gray(img)
+
+
+def _runs(mask, length, coverage=1.0, axis=1):
+    """Start offsets (along axis) of `length`-pixel windows that are at least `coverage` dark, as a boolean array."""
+    sums = np.cumsum(mask, axis=axis, dtype=np.int32)
+    sums = np.concatenate([np.zeros_like(sums.take([0], axis=axis)), sums], axis=axis)
+    upper = sums.take(range(length, sums.shape[axis]), axis=axis)
+    lower = sums.take(range(0, sums.shape[axis] - length), axis=axis)
+    return (upper - lower) >= coverage * length
+
+
+def _rules(rows):
+    """Groups consecutive row indices (a rule can be a few pixels thick) into [first, last] pairs."""
+    rules = []
+    for y in rows:
+        if rules and y - rules[-1][1] <= 1:
+            rules[-1][1] = y
+        else:
+            rules.append([y, y])
+    return rules
+
+
+def detect_table(gray, size=None):
+    """
+    (left, top, right, bottom) of the events table in a grayscale bulletin, or
+    None. With `size`, the original size `gray` was decoded from, the box is
+    returned in original pixels.
+    """
+    if np is None:
+        return None
+    width, height = gray.size
+    top, bottom = int(height * SEARCH_TOP), int(height * SEARCH_BOTTOM)
+    dark = np.asarray(gray)[top:bottom] < (DARK_REDUCED if size and size != gray.size else DARK)
+
+    run = max(1, int(width * RULE_MIN))
+    if run >= width:
+        return None
+    starts = _runs(dark, run, COVERAGE)[:, :max(1, int(width * RULE_START))]
+    rules = _rules(np.flatnonzero(starts.any(axis=1)))
+    if not rules:
+        return None
+
+    # The table is the first chain of rules spaced at most one table row apart
+    table = [rules[0]]
+    for rule in rules[1:]:
+        if rule[0] - table[-1][1] > height * MAX_ROW:
+            break
+        table.append(rule)
+    if len(table) < MIN_RULES:
+        return None
+
+    # Its width is the stretch from the left where most rules are dark (the top
+    # rule can run on into the map's border, and the map's own border crosses them)
+    lines = dark[[first + int(np.argmax(dark[first:last + 1].sum(axis=1))) for first, last in table]]
+    columns = np.flatnonzero(lines.mean(axis=0) >= 0.5)
+    if not len(columns):
+        return None
+    gaps = np.flatnonzero(np.diff(columns) > max(2, width * 0.01))
+    left, right = int(columns[0]), int(columns[gaps[0]] if len(gaps) else columns[-1])
+    if right - left < run:
+        return None
+    y0, y1 = top + int(table[0][0]), top + int(table[-1][1])
+    rect = (max(0, left - PAD), max(0, y0 - PAD), min(width, right + 1 + PAD), min(height, y1 + 1 + PAD))
+    if size and size != gray.size:
+        rect = _scale_rect(rect, size[0] / width, size[1] / height, size)
+    return rect
+
+
+def _scale_rect(rect, sx, sy, size):
+    left, top, right, bottom = rect
+    return (max(0, int(left * sx)), max(0, int(top * sy)),
+            min(size[0], round(right * sx)), min(size[1], round(bottom * sy)))
+
+
+def otsu_threshold(pixels):
+    """Gray level that best separates ink from background (Otsu's method over the histogram)."""
+    hist = np.bincount(pixels.ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256)
+    weight = np.cumsum(hist)
+    mean = np.cumsum(hist * levels)
+    total, total_mean = weight[-1], mean[-1]
+    background = total - weight
+    with np.errstate(divide='ignore', invalid='ignore'):
+        between = (total_mean * weight - mean * total) ** 2 / (weight * background)
+    between[~np.isfinite(between)] = 0
+    return int(np.argmax(between))
+
+
+def binarize(gray):
+    """Black text on white with the table rules removed, so Tesseract sees text lines only."""
+    pixels = np.asarray(gray)
+    ink = pixels <= otsu_threshold(pixels)
+    height, width = ink.shape
+    # A rule is a dark run spanning half the crop; no text line has one
+    if width > 1:
+        ink[_runs(ink, max(1, width // 2), COVERAGE).any(axis=1)] = False
+    if height > 1:
+        ink[:, _runs(ink, max(1, height // 2), COVERAGE, axis=0).any(axis=0)] = False
+    return Image.fromarray(np.where(ink, 0, 255).astype(np.uint8), 'L')
+
+
+def prepare(gray, rect, size=None):
+    """
+    The OCR input for the crop `rect` (original pixels) of a decode()d image
+    of original `size`: grayscale, and with numpy scaled and binarized.
+    """
+    size = size or gray.size
+    if size != gray.size:
+        rect = _scale_rect(rect, gray.width / size[0], gray.height / size[1], gray.size)
+    cropped = to_gray(gray.crop(rect))
+    if np is None:
+        return cropped
+    scale = TARGET_WIDTH / gray.width
+    if abs(scale - 1) > 0.05:
+        cropped = cropped.resize((max(1, round(cropped.width * scale)), max(1, round(cropped.height * scale))),
+                                 Image.LANCZOS)
+    return binarize(cropped)
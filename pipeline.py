@@ -0,0 +1,307 @@
+import os
+import sys
+import csv
+import json
+import time
+import sqlite3
+import hashlib
+import inspect
+import threading
+import concurrent.futures
+
+import scraper
+import content_scraper
+import download_images
+import image_store
+import ocr_engine
+import ocr_preprocess
+import ocr_cache
+import ocr_images
+import ocr_classifier
+import clean_ocr_data
+import analyze_pla_data
+import merge_pla_data
+import migrate_to_supabase
+import supabase_api
+import analytics_store
+import rollups
+import snapshots
+import sync_state
+import text_extraction
+from jsonl_io import write_records
+
+# Single entry point for the whole ingest:
+#
+#   scrape -> details -> images -> ocr -> clean -> merge -> upload
+#                     \-> analyze -------------/     \-> store -> rollups, snapshots
+#
+# Every per-record stage stores (input fingerprint, output) per record key in
+# pipeline_state.sqlite. The fingerprint covers the record's input and the
+# source of the modules that implement the stage, so a re-run only touches
+# records whose inputs (or the stage's code) changed. Stages whose
+# dependencies are done run concurrently (e.g. analyze alongside images/ocr).
+STATE_FILE = os.environ.get("PIPELINE_STATE_FILE", "pipeline_state.sqlite")
+
+
+def code_version(*modules):
+    digest = hashlib.sha256()
+    for module in modules:
+        with open(inspect.getsourcefile(module), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def fingerprint(record, version):
+    payload = json.dumps(record, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(f"{version}\n{payload}".encode('utf-8')).hexdigest()
+
+
+class StateStore:
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS stage_records (
+                    stage TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    output TEXT,
+                    PRIMARY KEY (stage, key)
+                )
+            """)
+
+    def load(self, stage):
+        with self.lock:
+            rows = self.conn.execute("SELECT key, fingerprint, output FROM stage_records WHERE stage=?", (stage,)).fetchall()
+        return {key: (fp, json.loads(output) if output is not None else None) for key, fp, output in rows}
+
+    def save(self, stage, key, fp, output):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO stage_records VALUES (?, ?, ?, ?)",
+                              (stage, key, fp, json.dumps(output, ensure_ascii=False)))
+
+
+class Stage:
+    """
+    A pipeline node.
+
+    `inputs(upstream)` turns the outputs of the dependencies ({dep: {key: output}})
+    into (key, input_record) pairs; `run(input_record)` produces the output for
+    one record. `output_file`, if set, receives the stage's outputs as JSONL so
+    the standalone scripts can pick up from any point. With `pool`, `run` must
+    be a module-level function, as it is called in the pool's worker processes.
+    """
+
+    def __init__(self, name, deps, inputs, run, modules, workers=4, output_file=None, pool=None):
+        self.name = name
+        self.deps = deps
+        self.inputs = inputs
+        self.run = run
+        self.version = code_version(*modules)
+        self.workers = workers
+        self.output_file = output_file
+        # Executor factory (workers -> Executor) for CPU-bound stages; threads by default
+        self.pool = pool
+
+
+# --- Stage implementations ---
+def scrape_inputs(upstream):
+    # The list crawl is the source of the graph: one pseudo-record per run
+    return [("list", {"run": time.strftime('%Y-%m-%d')})]
+
+
+def scrape_since():
+    """
+    First list date to crawl: the sync window (sync_state, as the daily updater
+    uses it), but never past the newest day already in pla_activity.csv, so a
+    local list that is behind the remote mark still catches up. None crawls
+    back to scraper.TARGET_DATE.
+    """
+    start = sync_state.window_start(sync_state.load())
+    try:
+        with open('pla_activity.csv', 'r', encoding='utf-8-sig') as f:
+            latest = max((row['date'] for row in csv.DictReader(f) if row.get('date')), default=None)
+    except FileNotFoundError:
+        return None
+    if not start or not latest:
+        return None
+    return min(start, latest)
+
+
+def run_scrape(_):
+    # Only the list pages inside the window are crawled; older rows are kept
+    scraper.scrape(since=scrape_since())
+    with open('pla_activity.csv', 'r', encoding='utf-8-sig') as f:
+        return list(csv.DictReader(f))
+
+
+def details_inputs(upstream):
+    return [(row['link'], row) for row in upstream['scrape'].get('list') or []]
+
+
+def by_activity_date(dep):
+    def inputs(upstream):
+        return [(out['activity_date'], out) for out in upstream[dep].values() if out]
+    return inputs
+
+
+def run_images(detail):
+    download_images.download_image(detail)
+    entry = image_store.lookup(detail['activity_date'])
+    return dict(entry, activity_date=detail['activity_date']) if entry else None
+
+
+def ocr_inputs(upstream):
+    return [(date, entry) for date, entry in upstream['images'].items() if entry]
+
+
+def run_ocr(entry):
+    return ocr_images.process_image(image_store.path_for(entry), entry['activity_date'], entry['sha256'])
+
+
+def ocr_pool(workers):
+    # As in ocr_images: worker processes (no GIL contention with tesserocr), the
+    # language probed once here and the model loaded once per worker
+    return concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=ocr_engine.init_worker,
+                                                  initargs=(ocr_engine.ocr_lang(),))
+
+
+def clean_inputs(upstream):
+    return [(date, out) for date, out in upstream['ocr'].items() if out and 'error' not in out]
+
+
+def merge_inputs(upstream):
+    cleaned = upstream['clean']
+    return [(date, {"analysis": out, "ocr": cleaned.get(date)}) for date, out in upstream['analyze'].items() if out]
+
+
+def run_merge(pair):
+    ocr_map = {pair['analysis']['activity_date']: pair['ocr']} if pair['ocr'] else {}
+    return next(merge_pla_data.merge_records([pair['analysis']], ocr_map))
+
+
+def run_store(item):
+    # Local columnar copy for offline analysis (analytics_store)
+    analytics_store.upsert([item])
+    return item
+
+
+def rollup_inputs(upstream):
+    # One pseudo-record: re-run whenever the local store changed
+    return [("summary", {"revision": analytics_store.revision()})]
+
+
+def run_rollups(_):
+    summary = rollups.write_summary(rollups.build_local())
+    try:
+        rollups.refresh_remote()
+    except Exception as e:
+        print(f"Warning: could not refresh the Supabase rollups: {e}")
+    return {"latest_date": summary["latest_date"]}
+
+
+def run_snapshots(_):
+    manifest = snapshots.publish_local()
+    return {"latest_date": manifest["latest_date"], "shards": [shard["file"] for shard in manifest["shards"]]}
+
+
+def run_upload(item):
+    # Returns the uploaded record so a failed upload (None) is retried next run
+    return item if migrate_to_supabase.migrate_record(dict(item)) else None
+
+
+STAGES = [
+    Stage('scrape', [], scrape_inputs, run_scrape, [scraper], workers=1),
+    Stage('details', ['scrape'], details_inputs, content_scraper.scrape_detail, [content_scraper], workers=10,
+          output_file='pla_details.jsonl'),
+    Stage('images', ['details'], by_activity_date('details'), run_images, [download_images], workers=10),
+    Stage('ocr', ['images'], ocr_inputs, run_ocr, [ocr_images, ocr_engine, ocr_preprocess, ocr_cache],
+          workers=ocr_engine.worker_count(), output_file='ocr_results.jsonl', pool=ocr_pool),
+    Stage('clean', ['ocr'], clean_inputs, lambda rec: next(clean_ocr_data.clean_records([rec])), [clean_ocr_data, ocr_classifier],
+          output_file='ocr_cleaned.jsonl'),
+    Stage('analyze', ['details'], by_activity_date('details'), lambda rec: next(analyze_pla_data.analyze_records([rec])),
+          [analyze_pla_data, text_extraction], output_file='pla_analysis.jsonl'),
+    Stage('merge', ['analyze', 'clean'], merge_inputs, run_merge, [merge_pla_data], output_file='merged_pla_data.jsonl'),
+    Stage('store', ['merge'], by_activity_date('merge'), run_store, [analytics_store], workers=1),
+    Stage('upload', ['merge'], by_activity_date('merge'), run_upload, [migrate_to_supabase, supabase_api], workers=1),
+    Stage('rollups', ['store', 'upload'], rollup_inputs, run_rollups, [rollups], workers=1),
+    Stage('snapshots', ['store'], rollup_inputs, run_snapshots, [snapshots, analytics_store], workers=1),
+]
+
+
+def run_stage(stage, upstream, state, force=False):
+    """Runs one stage over its inputs, skipping records whose fingerprint is unchanged."""
+    previous = state.load(stage.name)
+    outputs = {}
+    todo = []
+    for key, record in stage.inputs(upstream):
+        fp = fingerprint(record, stage.version)
+        cached = previous.get(key)
+        if cached and cached[0] == fp and cached[1] is not None and not force:
+            outputs[key] = cached[1]
+        else:
+            todo.append((key, fp, record))
+
+    def finish(key, fp, result):
+        try:
+            output = result()
+        except PermissionError:
+            # Supabase refused the key (supabase_api.check_write): stop the run
+            raise
+        except Exception as e:
+            print(f"[{stage.name}] {key}: {e}")
+            output = None
+        state.save(stage.name, key, fp, output)
+        outputs[key] = output
+
+    if stage.pool and todo:
+        # Records run in the pool's processes; their state is saved here as they finish
+        with stage.pool(max(1, stage.workers)) as executor:
+            futures = {executor.submit(stage.run, record): (key, fp) for key, fp, record in todo}
+            for future in concurrent.futures.as_completed(futures):
+                finish(*futures[future], future.result)
+    else:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, stage.workers)) as executor:
+            list(executor.map(lambda item: finish(item[0], item[1], lambda: stage.run(item[2])), todo))
+
+    if stage.output_file:
+        write_records(stage.output_file, (out for _, out in sorted(outputs.items()) if out))
+    print(f"[{stage.name}] {len(todo)} run, {len(outputs) - len(todo)} unchanged")
+    return outputs
+
+
+def run_pipeline(skip=(), force=False):
+    state = StateStore(STATE_FILE)
+    results = {}
+    pending = {stage.name: stage for stage in STAGES}
+    running = {}
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(STAGES)) as executor:
+        while pending or running:
+            # Start every stage whose dependencies have finished
+            for name, stage in list(pending.items()):
+                if all(dep in results for dep in stage.deps):
+                    del pending[name]
+                    if name in skip:
+                        # Reuse the last recorded outputs without running the stage
+                        results[name] = {key: out for key, (_, out) in state.load(name).items()}
+                        continue
+                    upstream = {dep: results[dep] for dep in stage.deps}
+                    running[executor.submit(run_stage, stage, upstream, state, force)] = name
+            if not running:
+                continue
+            done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+    return results
+
+
+if __name__ == "__main__":
+    # --offline: reuse the last list crawl; --no-upload: stop before Supabase; --force: ignore fingerprints
+    skip = set()
+    if "--offline" in sys.argv:
+        skip.add('scrape')
+    if "--no-upload" in sys.argv:
+        skip.add('upload')
+    run_pipeline(skip=skip, force="--force" in sys.argv)
@@ -0,0 +1,166 @@
+import os
+import sys
+import json
+from datetime import date, datetime, timedelta, timezone
+import http_client
+import supabase_api
+import analytics_store
+from analytics_store import COUNT_FIELDS
+
+# Precomputed dashboard aggregates, so the first paint of index.html needs one
+# small static file instead of the full joined history:
+#
+#   windows  KPIs, peak day and aircraft composition for the 7/30/90/all
+#            filter buttons (a window is the last N recorded days, as in app.js)
+#   daily    the last 90 recorded days (trend charts for the short windows)
+#   weekly / monthly rollups (trend for the full history)
+#
+# The local pipeline builds it from analytics_store. The daily updater, whose
+# runner has no full local history, refreshes the Supabase materialized views
+# (setup_database.sql) and builds the same file from them.
+#
+#   python rollups.py [--remote]
+SUMMARY_FILE = os.environ.get("SUMMARY_FILE", os.path.join("data", "summary.json"))
+
+WINDOWS = (7, 30, 90, 0)
+DAILY_DAYS = 90
+
+# Same buckets (first match wins) as the composition chart in app.js
+COMPOSITION = [
+    ("主戰機", ("fighter", "主戰")),
+    ("輔戰機", ("support", "輔戰")),
+    ("無人機", ("uav", "無人")),
+    ("直升機", ("heli", "直升")),
+]
+
+
+def composition_bucket(aircraft_type):
+    lowered = (aircraft_type or "").lower()
+    for bucket, keywords in COMPOSITION:
+        if any(word in lowered for word in keywords):
+            return bucket
+    return None
+
+
+def _counts(row):
+    return {field: int(row.get(field) or 0) for field in COUNT_FIELDS}
+
+
+def period_start(date_str, period):
+    day = date.fromisoformat(date_str)
+    if period == 'week':
+        return (day - timedelta(days=day.weekday())).isoformat()
+    return day.replace(day=1).isoformat()
+
+
+def rollup(daily, period):
+    """Sums daily rows ({activity_date, counts...}) into [{period, days, counts...}] per week or month."""
+    buckets = {}
+    for row in daily:
+        key = period_start(row['activity_date'], period)
+        bucket = buckets.setdefault(key, dict({"period": key, "days": 0}, **dict.fromkeys(COUNT_FIELDS, 0)))
+        bucket["days"] += 1
+        for field in COUNT_FIELDS:
+            bucket[field] += int(row.get(field) or 0)
+    return [buckets[key] for key in sorted(buckets)]
+
+
+# --- Local build (analytics_store) ---
+def window_kpis(cols, days):
+    lo = max(0, len(cols) - days) if days else 0
+    hi = len(cols)
+    kpis = {"days": hi - lo}
+    for field in COUNT_FIELDS:
+        kpis[field] = cols.prefix[field][hi] - cols.prefix[field][lo]
+
+    # Earliest day with the highest aircraft total, as renderKPIs picks it
+    max_day, max_date = 0, None
+    aircraft = cols.counts["aircraft_total"]
+    for i in range(lo, hi):
+        if aircraft[i] > max_day:
+            max_day, max_date = aircraft[i], analytics_store.from_day(cols.day[i])
+    kpis["max_day"], kpis["max_date"] = max_day, max_date
+
+    composition = dict.fromkeys((bucket for bucket, _ in COMPOSITION), 0)
+    total = 0
+    if hi > lo:
+        for aircraft_type, count in analytics_store.event_counts(analytics_store.from_day(cols.day[lo])):
+            bucket = composition_bucket(aircraft_type)
+            if bucket:
+                composition[bucket] += count or 0
+            total += count or 0
+    kpis["composition"], kpis["composition_total"] = composition, total
+    return kpis
+
+
+def build_local():
+    cols = analytics_store.columns()
+    daily = [dict({"activity_date": analytics_store.from_day(day)},
+                  **{field: cols.counts[field][i] for field in COUNT_FIELDS})
+             for i, day in enumerate(cols.day)]
+    return {
+        "latest_date": daily[-1]["activity_date"] if daily else None,
+        "windows": {str(days): window_kpis(cols, days) for days in WINDOWS},
+        "daily": daily[-DAILY_DAYS:],
+        "weekly": rollup(daily, 'week'),
+        "monthly": rollup(daily, 'month'),
+    }
+
+
+# --- Remote build (Supabase materialized views) ---
+def refresh_remote():
+    """Refreshes the rollup materialized views after an ingest (needs the service_role key in SUPABASE_KEY)."""
+    resp = http_client.post(f"{supabase_api.SUPABASE_URL}/rest/v1/rpc/refresh_pla_rollups", headers=supabase_api.HEADERS,
+                            json={}, timeout=60)
+    supabase_api.check_write(resp, "Rollup refresh", ok=(200, 204))
+
+
+def _select(path):
+    resp = http_client.get(supabase_api.rest_url(path), headers=supabase_api.HEADERS, timeout=30)
+    resp.raise_for_status()
+    return resp.json()
+
+
+def build_remote():
+    fields = ",".join(COUNT_FIELDS)
+    windows = {}
+    for row in _select("pla_window_kpis?select=*"):
+        kpis = dict({"days": row["days"]}, **_counts(row))
+        kpis["max_day"], kpis["max_date"] = row["max_day"] or 0, row["max_date"]
+        kpis["composition"] = {bucket: int(row.get(f"comp_{i}") or 0) for i, (bucket, _) in enumerate(COMPOSITION)}
+        kpis["composition_total"] = int(row["composition_total"] or 0)
+        windows[str(row["window_days"])] = kpis
+    daily = _select(f"pla_activity?select=activity_date,{fields}&order=activity_date.desc&limit={DAILY_DAYS}")[::-1]
+    weekly = _select(f"pla_rollup_weekly?select=period,days,{fields}&order=period.asc")
+    monthly = _select(f"pla_rollup_monthly?select=period,days,{fields}&order=period.asc")
+    return {
+        "latest_date": daily[-1]["activity_date"] if daily else None,
+        "windows": windows,
+        "daily": [dict({"activity_date": row["activity_date"]}, **_counts(row)) for row in daily],
+        "weekly": [dict({"period": row["period"], "days": row["days"]}, **_counts(row)) for row in weekly],
+        "monthly": [dict({"period": row["period"], "days": row["days"]}, **_counts(row)) for row in monthly],
+    }
+
+
+def write_summary(summary):
+    summary = dict(summary, generated_at=datetime.now(timezone.utc).isoformat())
+    os.makedirs(os.path.dirname(SUMMARY_FILE) or '.', exist_ok=True)
+    tmp = SUMMARY_FILE + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp, SUMMARY_FILE)
+    print(f"Wrote {SUMMARY_FILE} ({os.path.getsize(SUMMARY_FILE)} bytes, latest {summary['latest_date']}).")
+    return summary
+
+
+def publish_remote():
+    """Refreshes the Supabase views and writes the summary file from them (used by the daily updater)."""
+    refresh_remote()
+    return write_summary(build_remote())
+
+
+if __name__ == "__main__":
+    if "--remote" in sys.argv:
+        publish_remote()
+    else:
+        write_summary(build_local())
@@ -1,6 +1,10 @@
 -- 1. Reset: Drop existing tables if they exist (WARNING: This deletes all existing data!)
+DROP MATERIALIZED VIEW IF EXISTS public.pla_window_kpis;
+DROP MATERIALIZED VIEW IF EXISTS public.pla_rollup_weekly;
+DROP MATERIALIZED VIEW IF EXISTS public.pla_rollup_monthly;
 DROP TABLE IF EXISTS public.pla_flight_events;
 DROP TABLE IF EXISTS public.pla_activity;
+DROP TABLE IF EXISTS public.pla_sync_state;
 
 -- 2. Create the Main Activity Table (Announcement Level)
 CREATE TABLE public.pla_activity (
@@ -30,17 +34,180 @@ CREATE TABLE public.pla_flight_events (
   details TEXT[]                       -- Array of tags, e.g., ["Crossed Median Line"]
 );
 
+-- 3b. Sync high-water mark for the daily updater (one row per synced table)
+CREATE TABLE public.pla_sync_state (
+  id TEXT PRIMARY KEY,                 -- e.g. "pla_activity"
+  publish_date DATE,                   -- Newest announcement date uploaded
+  link_id BIGINT,                      -- Its bulletin id (/news/plaact/<id>)
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now()) NOT NULL
+);
+
 -- 4. Set Up Row Level Security (RLS)
 ALTER TABLE public.pla_activity ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.pla_flight_events ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.pla_sync_state ENABLE ROW LEVEL SECURITY;
 
--- 5. Create Policies (Allow public read, allow API insert)
+-- 5. Create Policies (Allow public read; writes only with the service_role key)
+-- The anon key is public (config.js), so anon stays read-only. The updater and
+-- migrate_to_supabase.py send the service_role key (SUPABASE_KEY secret).
+-- Migration for an existing project: the earlier policies let anon write, so
+-- drop them and re-run this section, 6b and 7; until then (or with the anon
+-- key) uploads stop with supabase_api.check_write's PermissionError.
 CREATE POLICY "Enable read access for all users" ON public.pla_activity FOR SELECT USING (true);
 CREATE POLICY "Enable read access for all users" ON public.pla_flight_events FOR SELECT USING (true);
-CREATE POLICY "Enable insert access for all users" ON public.pla_activity FOR INSERT WITH CHECK (true);
-CREATE POLICY "Enable insert access for all users" ON public.pla_flight_events FOR INSERT WITH CHECK (true);
+CREATE POLICY "Enable insert access for service role" ON public.pla_activity FOR INSERT TO service_role WITH CHECK (true);
+CREATE POLICY "Enable insert access for service role" ON public.pla_flight_events FOR INSERT TO service_role WITH CHECK (true);
+-- upsert_pla_batch (6b) updates existing days and replaces their events
+CREATE POLICY "Enable update access for service role" ON public.pla_activity FOR UPDATE TO service_role USING (true) WITH CHECK (true);
+CREATE POLICY "Enable delete access for service role" ON public.pla_flight_events FOR DELETE TO service_role USING (true);
+-- Anyone may read the sync mark, but only the updater may move it: a mark pushed
+-- forward would make the updater skip every day before it
+CREATE POLICY "Enable read access for all users" ON public.pla_sync_state FOR SELECT USING (true);
+CREATE POLICY "Enable insert access for service role" ON public.pla_sync_state FOR INSERT TO service_role WITH CHECK (true);
+CREATE POLICY "Enable update access for service role" ON public.pla_sync_state FOR UPDATE TO service_role USING (true) WITH CHECK (true);
 
 -- 6. Indices for performance
 CREATE INDEX idx_pla_activity_date ON public.pla_activity(activity_date);
+CREATE INDEX idx_pla_activity_publish_date ON public.pla_activity(publish_date);
 CREATE INDEX idx_pla_flight_events_date ON public.pla_flight_events(activity_date);
 CREATE INDEX idx_pla_flight_events_type ON public.pla_flight_events(aircraft_type);
+CREATE INDEX idx_pla_flight_events_activity_id ON public.pla_flight_events(activity_id);
+
+-- 6b. Batch upload (supabase_api.upsert_batch). The activity rows, the removal
+-- of their old events and the insert of the new ones happen in one
+-- transaction, so a failed request can never leave a day without its events.
+-- `records` is a JSON array of pla_activity rows, each with an `events` array
+-- of pla_flight_events rows. Returns the id of every upserted day.
+CREATE OR REPLACE FUNCTION public.upsert_pla_batch(records jsonb)
+RETURNS TABLE (activity_date date, id bigint)
+LANGUAGE plpgsql SET search_path = public AS $$
+#variable_conflict use_column
+BEGIN
+  RETURN QUERY
+  WITH upserted AS (
+    INSERT INTO pla_activity AS a (activity_date, publish_date, link, aircraft_total, aircraft_crossing,
+                                   vessels_total, official_ships_total, balloons_total, original_text, image_file)
+    SELECT r.activity_date, r.publish_date, r.link, r.aircraft_total, r.aircraft_crossing,
+           r.vessels_total, r.official_ships_total, r.balloons_total, r.original_text, r.image_file
+    FROM jsonb_to_recordset(records) AS r(activity_date date, publish_date date, link text, aircraft_total int,
+                                          aircraft_crossing int, vessels_total int, official_ships_total int,
+                                          balloons_total int, original_text text, image_file text)
+    ON CONFLICT (activity_date) DO UPDATE SET
+      publish_date = excluded.publish_date, link = excluded.link,
+      aircraft_total = excluded.aircraft_total, aircraft_crossing = excluded.aircraft_crossing,
+      vessels_total = excluded.vessels_total, official_ships_total = excluded.official_ships_total,
+      balloons_total = excluded.balloons_total, original_text = excluded.original_text,
+      image_file = excluded.image_file
+    RETURNING a.id, a.activity_date, a.link
+  ),
+  -- Every CTE sees the events as they were before the statement, so this
+  -- removes only the old events and leaves the new ones alone
+  removed AS (
+    DELETE FROM pla_flight_events e USING upserted u WHERE e.activity_id = u.id
+  ),
+  added AS (
+    INSERT INTO pla_flight_events (activity_id, activity_date, link, time_range, aircraft_type, count, details)
+    SELECT u.id, u.activity_date, u.link, ev.time_range, ev.aircraft_type, ev.count, ev.details
+    FROM jsonb_array_elements(records) AS rec
+    JOIN upserted u ON u.activity_date = (rec->>'activity_date')::date
+    CROSS JOIN LATERAL jsonb_to_recordset(coalesce(rec->'events', '[]'::jsonb))
+      AS ev(time_range text, aircraft_type text, count int, details text[])
+  )
+  SELECT u.activity_date, u.id FROM upserted u;
+END;
+$$;
+REVOKE EXECUTE ON FUNCTION public.upsert_pla_batch(jsonb) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.upsert_pla_batch(jsonb) TO service_role;
+
+-- 7. Dashboard rollups (rollups.py / data/summary.json), refreshed after each ingest
+CREATE MATERIALIZED VIEW public.pla_rollup_weekly AS
+SELECT date_trunc('week', activity_date)::date AS period,
+       count(*) AS days,
+       sum(aircraft_total) AS aircraft_total,
+       sum(aircraft_crossing) AS aircraft_crossing,
+       sum(vessels_total) AS vessels_total,
+       sum(official_ships_total) AS official_ships_total,
+       sum(balloons_total) AS balloons_total
+FROM public.pla_activity
+GROUP BY 1;
+
+CREATE MATERIALIZED VIEW public.pla_rollup_monthly AS
+SELECT date_trunc('month', activity_date)::date AS period,
+       count(*) AS days,
+       sum(aircraft_total) AS aircraft_total,
+       sum(aircraft_crossing) AS aircraft_crossing,
+       sum(vessels_total) AS vessels_total,
+       sum(official_ships_total) AS official_ships_total,
+       sum(balloons_total) AS balloons_total
+FROM public.pla_activity
+GROUP BY 1;
+
+-- One row per dashboard filter: the last N recorded days (0 = all), as in app.js.
+-- comp_0..comp_3 are the composition buckets 主戰機/輔戰機/無人機/直升機 (first match wins).
+CREATE MATERIALIZED VIEW public.pla_window_kpis AS
+WITH windows(window_days) AS (VALUES (7), (30), (90), (0)),
+ranked AS (
+  SELECT a.*, row_number() OVER (ORDER BY activity_date DESC) AS rn FROM public.pla_activity a
+),
+scoped AS (
+  SELECT w.window_days, r.* FROM windows w JOIN ranked r ON w.window_days = 0 OR r.rn <= w.window_days
+),
+totals AS (
+  SELECT window_days, count(*) AS days,
+         sum(aircraft_total) AS aircraft_total, sum(aircraft_crossing) AS aircraft_crossing,
+         sum(vessels_total) AS vessels_total, sum(official_ships_total) AS official_ships_total,
+         sum(balloons_total) AS balloons_total
+  FROM scoped GROUP BY window_days
+),
+peaks AS (
+  SELECT DISTINCT ON (window_days) window_days, aircraft_total AS max_day, activity_date AS max_date
+  FROM scoped WHERE aircraft_total > 0
+  ORDER BY window_days, aircraft_total DESC, activity_date ASC
+),
+typed AS (
+  SELECT s.window_days, e.count,
+         CASE WHEN lower(e.aircraft_type) LIKE '%fighter%' OR e.aircraft_type LIKE '%主戰%' THEN 0
+              WHEN lower(e.aircraft_type) LIKE '%support%' OR e.aircraft_type LIKE '%輔戰%' THEN 1
+              WHEN lower(e.aircraft_type) LIKE '%uav%' OR e.aircraft_type LIKE '%無人%' THEN 2
+              WHEN lower(e.aircraft_type) LIKE '%heli%' OR e.aircraft_type LIKE '%直升%' THEN 3
+         END AS bucket
+  FROM scoped s JOIN public.pla_flight_events e ON e.activity_id = s.id
+),
+composition AS (
+  SELECT window_days,
+         sum(count) FILTER (WHERE bucket = 0) AS comp_0,
+         sum(count) FILTER (WHERE bucket = 1) AS comp_1,
+         sum(count) FILTER (WHERE bucket = 2) AS comp_2,
+         sum(count) FILTER (WHERE bucket = 3) AS comp_3,
+         sum(count) AS composition_total
+  FROM typed GROUP BY window_days
+)
+SELECT w.window_days,
+       coalesce(t.days, 0) AS days,
+       coalesce(t.aircraft_total, 0) AS aircraft_total,
+       coalesce(t.aircraft_crossing, 0) AS aircraft_crossing,
+       coalesce(t.vessels_total, 0) AS vessels_total,
+       coalesce(t.official_ships_total, 0) AS official_ships_total,
+       coalesce(t.balloons_total, 0) AS balloons_total,
+       coalesce(p.max_day, 0) AS max_day, p.max_date,
+       coalesce(c.comp_0, 0) AS comp_0, coalesce(c.comp_1, 0) AS comp_1,
+       coalesce(c.comp_2, 0) AS comp_2, coalesce(c.comp_3, 0) AS comp_3,
+       coalesce(c.composition_total, 0) AS composition_total
+FROM windows w
+LEFT JOIN totals t USING (window_days)
+LEFT JOIN peaks p USING (window_days)
+LEFT JOIN composition c USING (window_days);
+
+GRANT SELECT ON public.pla_rollup_weekly, public.pla_rollup_monthly, public.pla_window_kpis TO anon, authenticated;
+
+CREATE OR REPLACE FUNCTION public.refresh_pla_rollups() RETURNS void
+LANGUAGE plpgsql SECURITY DEFINER SET search_path = public AS $$
+BEGIN
+  REFRESH MATERIALIZED VIEW public.pla_rollup_weekly;
+  REFRESH MATERIALIZED VIEW public.pla_rollup_monthly;
+  REFRESH MATERIALIZED VIEW public.pla_window_kpis;
+END;
+$$;
+-- Only the updater (service_role key) may refresh: a refresh rebuilds every view
+REVOKE EXECUTE ON FUNCTION public.refresh_pla_rollups() FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.refresh_pla_rollups() TO service_role;
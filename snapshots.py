@@ -0,0 +1,211 @@
+import os
+import sys
+import glob
+import gzip
+import json
+import hashlib
+from datetime import date, datetime, timedelta, timezone
+import http_client
+import supabase_api
+import analytics_store
+import rollups
+from analytics_store import COUNT_FIELDS
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Static, content-addressed copies of the dashboard data, so index.html can be
+# served from a CDN (or offline, via sw.js) without a database round trip:
+#
+#   data/manifest.json                   small, always revalidated
+#   data/snapshots/recent.<hash>.json    summary feed: the last RECENT_DAYS days
+#   data/snapshots/<year>.<hash>.json    summary feed: older days, one shard per year
+#   data/events/<YYYY-MM>.<hash>.json    per-day original_text + flight events,
+#                                        fetched only when a day is opened
+#
+# Feed rows carry the activity columns (no text, no events) and a per-day
+# `composition` ([主戰機, 輔戰機, 無人機, 直升機, all sorties], as rollups.py
+# buckets them) so the composition chart never needs the events.
+#
+# Each shard also gets .gz (and .br when the brotli module is installed)
+# siblings for hosts that serve precompressed files. A shard's name changes
+# only when its content does, so it can be cached forever; older years are
+# carried over from the previous manifest untouched.
+#
+#   python snapshots.py [--remote]
+DATA_DIR = os.environ.get("SNAPSHOT_DIR", "data")
+SHARD_DIR = os.path.join(DATA_DIR, "snapshots")
+EVENT_DIR = os.path.join(DATA_DIR, "events")
+MANIFEST_FILE = os.path.join(DATA_DIR, "manifest.json")
+
+RECENT_DAYS = int(os.environ.get("SNAPSHOT_RECENT_DAYS", "120"))
+PAGE_SIZE = 1000
+
+FEED_COLUMNS = ("activity_date", "publish_date", "link") + COUNT_FIELDS + ("image_file",)
+BUCKET_INDEX = {bucket: i for i, (bucket, _) in enumerate(rollups.COMPOSITION)}
+
+
+def load_manifest():
+    try:
+        with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def rebuild_start(manifest):
+    """First day whose shard can change: Jan 1 of the year the previous recent shard starts in."""
+    if not manifest or not manifest.get("recent_from"):
+        return None
+    return manifest["recent_from"][:4] + "-01-01"
+
+
+def write_file(directory, name, content):
+    """Writes `content` as <directory>/<name>.<hash>.json (+ .gz/.br) unless it exists. Returns its manifest entry."""
+    payload = json.dumps(content, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    digest = hashlib.sha256(payload).hexdigest()
+    filename = f"{name}.{digest[:12]}.json"
+    path = os.path.join(directory, filename)
+    if not os.path.exists(path):
+        with open(path, 'wb') as f:
+            f.write(payload)
+        with open(path + '.gz', 'wb') as f:
+            f.write(gzip.compress(payload, 9, mtime=0))
+        if brotli:
+            with open(path + '.br', 'wb') as f:
+                f.write(brotli.compress(payload))
+    return {"name": name, "file": f"{os.path.basename(directory)}/{filename}", "sha256": digest,
+            "bytes": len(payload), "gzip_bytes": os.path.getsize(path + '.gz')}
+
+
+def feed_row(row):
+    feed = {column: row.get(column) for column in FEED_COLUMNS}
+    composition = [0] * (len(rollups.COMPOSITION) + 1)
+    for event in row.get("pla_flight_events") or []:
+        bucket = rollups.composition_bucket(event.get("aircraft_type"))
+        count = event.get("count") or 0
+        if bucket:
+            composition[BUCKET_INDEX[bucket]] += count
+        composition[-1] += count
+    feed["composition"] = composition
+    return feed
+
+
+def detail_entry(row):
+    events = [{key: event.get(key) for key in ("time_range", "aircraft_type", "count", "details")}
+              for event in row.get("pla_flight_events") or []]
+    return {"original_text": row.get("original_text"), "events": events}
+
+
+def write_shard(name, rows):
+    entry = write_file(SHARD_DIR, name, [feed_row(row) for row in rows])
+    return dict(entry, rows=len(rows), **{"from": rows[0]["activity_date"], "to": rows[-1]["activity_date"]})
+
+
+def write_event_shard(month, rows):
+    entry = write_file(EVENT_DIR, month, {row["activity_date"]: detail_entry(row) for row in rows})
+    return dict(entry, days=len(rows))
+
+
+def build(rows, start=None):
+    """
+    Writes feed and event shards for `rows` (oldest first, covering every day
+    from `start` on) and the manifest. Shards before `start` are kept from the
+    previous manifest. Returns the manifest.
+    """
+    rows = [row for row in rows if row.get("activity_date")]
+    os.makedirs(SHARD_DIR, exist_ok=True)
+    os.makedirs(EVENT_DIR, exist_ok=True)
+    previous = load_manifest() if start else None
+    if start and not previous:
+        raise RuntimeError(f"No {MANIFEST_FILE} to carry older shards over from; rebuild from the full history.")
+
+    latest = rows[-1]["activity_date"] if rows else (previous or {}).get("latest_date")
+    cutoff = (date.fromisoformat(latest) - timedelta(days=RECENT_DAYS)).isoformat() if latest else None
+
+    shards, events = [], []
+    if previous:
+        shards = [shard for shard in previous["shards"] if shard["name"] != "recent" and shard["to"] < start]
+        events = [shard for shard in previous.get("events", []) if shard["name"] < start[:7]]
+    years, months = {}, {}
+    recent = []
+    for row in rows:
+        if row["activity_date"] >= cutoff:
+            recent.append(row)
+        else:
+            years.setdefault(row["activity_date"][:4], []).append(row)
+        months.setdefault(row["activity_date"][:7], []).append(row)
+    for year in sorted(years):
+        shards.append(write_shard(year, years[year]))
+    shards.sort(key=lambda shard: shard["from"])
+    if recent:
+        shards.append(write_shard("recent", recent))
+    for month in sorted(months):
+        events.append(write_event_shard(month, months[month]))
+
+    manifest = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "latest_date": latest,
+        "recent_from": cutoff,
+        "shards": shards,
+        "events": events,
+    }
+    tmp = MANIFEST_FILE + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, MANIFEST_FILE)
+    prune(manifest)
+    print(f"Wrote {MANIFEST_FILE}: {len(shards)} feed shards, {len(events)} event shards, "
+          f"{sum(s['rows'] for s in shards)} days, latest {latest}.")
+    return manifest
+
+
+def prune(manifest):
+    # Files no longer referenced by the manifest (and their compressed siblings)
+    keep = {shard["file"] for shard in manifest["shards"] + manifest["events"]}
+    for directory in (SHARD_DIR, EVENT_DIR):
+        for path in glob.glob(os.path.join(directory, "*.json*")):
+            name = os.path.basename(path).split('.json')[0] + '.json'
+            if f"{os.path.basename(directory)}/{name}" not in keep:
+                os.remove(path)
+
+
+def remote_rows(start=None):
+    """Activity rows with embedded events from Supabase, oldest first, paged on activity_date."""
+    last = None
+    while True:
+        query = "select=*,pla_flight_events(activity_date,time_range,aircraft_type,count,details)&order=activity_date.asc"
+        if last:
+            query += f"&activity_date=gt.{last}"
+        elif start:
+            query += f"&activity_date=gte.{start}"
+        resp = http_client.get(f"{supabase_api.rest_url('pla_activity')}?{query}&limit={PAGE_SIZE}",
+                               headers=supabase_api.HEADERS, timeout=60)
+        resp.raise_for_status()
+        page = resp.json()
+        for row in page:
+            row.pop("id", None)
+            row.pop("created_at", None)
+            yield row
+        if len(page) < PAGE_SIZE:
+            return
+        last = page[-1]["activity_date"]
+
+
+def publish_local():
+    return build(analytics_store.activity_rows())
+
+
+def publish_remote():
+    """Rebuilds the shards that can have changed from Supabase (the whole history if there is no manifest yet)."""
+    start = rebuild_start(load_manifest())
+    return build(remote_rows(start), start)
+
+
+if __name__ == "__main__":
+    if "--remote" in sys.argv:
+        publish_remote()
+    else:
+        publish_local()
@@ -0,0 +1,80 @@
+import time
+import queue
+import threading
+
+# Threaded producer/consumer stages joined by bounded queues.
+#
+# Every stage has its own worker count (wide for network stages, core-sized
+# for OCR), and a full queue blocks whoever feeds it, so no more than
+# `maxsize` items ever wait between two stages however far ahead the first
+# stage could run. Results flow on as soon as they are ready: the last stage
+# sees its first item while the first is still producing.
+#
+# A stage's input is closed by putting DONE on it; once its workers have
+# drained it they close the stage's output in turn.
+DONE = object()
+
+
+def start(name, func, inbox, outbox, workers=1):
+    """
+    Runs `func` on every item from `inbox` in `workers` threads and puts the
+    non-None results on `outbox`. A failing item is reported and dropped.
+    Returns the threads.
+    """
+    remaining = [workers]
+    lock = threading.Lock()
+
+    def work():
+        try:
+            while True:
+                item = inbox.get()
+                if item is DONE:
+                    # Leave it for the other workers of this stage
+                    inbox.put(DONE)
+                    return
+                try:
+                    result = func(item)
+                except Exception as e:
+                    print(f"Error in {name} stage: {e}")
+                    continue
+                if result is not None:
+                    outbox.put(result)
+        finally:
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                outbox.put(DONE)
+
+    threads = [threading.Thread(target=work, name=f"{name}-{i}", daemon=True) for i in range(max(1, workers))]
+    remaining[0] = len(threads)
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def batches(inbox, size, linger):
+    """
+    Yields lists of up to `size` items from `inbox` until it is closed. A
+    partial batch is released once its first item has waited `linger` seconds,
+    so a slow producer still sees its results flushed.
+    """
+    batch = []
+    deadline = None
+    while True:
+        try:
+            item = inbox.get(timeout=None if deadline is None else max(0, deadline - time.monotonic()))
+        except queue.Empty:
+            yield batch
+            batch, deadline = [], None
+            continue
+        if item is DONE:
+            if batch:
+                yield batch
+            return
+        batch.append(item)
+        if deadline is None:
+            deadline = time.monotonic() + linger
+        if len(batch) >= size:
+            yield batch
+            batch, deadline = [], None
@@ -0,0 +1,71 @@
+// Service worker: lets the dashboard open offline from the last visit.
+//
+// - data/snapshots/*, data/events/*  content-hashed shards, never change: cache first
+// - everything else   (page, scripts, manifest, summary, CDN libraries): network
+//                     first, falling back to the cached copy when offline
+const CACHE = 'pla-dashboard-v1';
+const SHELL = ['./', 'index.html', 'app.js', 'aggregate_worker.js', 'config.js', 'data/manifest.json', 'data/summary.json'];
+
+self.addEventListener('install', event => {
+    // Missing files (e.g. no summary published yet) must not fail the install
+    event.waitUntil(caches.open(CACHE).then(cache => Promise.all(SHELL.map(url => cache.add(url).catch(() => null)))));
+    self.skipWaiting();
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil(caches.keys().then(keys => Promise.all(keys.filter(k => k !== CACHE).map(k => caches.delete(k)))));
+    self.clients.claim();
+});
+
+async function cacheFirst(request) {
+    const cached = await caches.match(request);
+    if (cached) return cached;
+    const response = await fetch(request);
+    if (response.ok) (await caches.open(CACHE)).put(request, response.clone());
+    return response;
+}
+
+async function networkFirst(request) {
+    try {
+        const response = await fetch(request);
+        if (response.ok || response.type === 'opaque') (await caches.open(CACHE)).put(request, response.clone());
+        return response;
+    } catch (e) {
+        const cached = await caches.match(request, { ignoreSearch: true });
+        if (cached) return cached;
+        throw e;
+    }
+}
+
+function isShard(url) {
+    return url.pathname.includes('/data/snapshots/') || url.pathname.includes('/data/events/');
+}
+
+async function pruneShards(manifestResponse) {
+    // Drop cached shards the new manifest no longer lists
+    const manifest = await manifestResponse.json();
+    const keep = new Set([...manifest.shards, ...(manifest.events || [])].map(s => new URL(`data/${s.file}`, self.registration.scope).href));
+    const cache = await caches.open(CACHE);
+    for (const request of await cache.keys()) {
+        if (isShard(new URL(request.url)) && !keep.has(request.url)) await cache.delete(request);
+    }
+}
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET') return;
+    const url = new URL(request.url);
+    // Live Supabase reads and the detail images are left to the browser
+    if (url.pathname.includes('/rest/v1/') || url.pathname.includes('/images/')) return;
+
+    if (url.origin === self.location.origin && isShard(url)) {
+        event.respondWith(cacheFirst(request));
+    } else if (url.pathname.endsWith('/data/manifest.json')) {
+        event.respondWith(networkFirst(request).then(response => {
+            if (response.ok) event.waitUntil(pruneShards(response.clone()).catch(() => null));
+            return response;
+        }));
+    } else {
+        event.respondWith(networkFirst(request));
+    }
+});
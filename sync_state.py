@@ -0,0 +1,100 @@
+import os
+import re
+import json
+from datetime import datetime, timedelta, timezone
+import http_client
+import supabase_api
+
+# High-water mark of the daily sync: the newest publish_date we have uploaded
+# and the numeric id of its bulletin (/news/plaact/<id>). Kept in a local file
+# and mirrored to the one-row pla_sync_state table so ephemeral CI runners
+# pick it up too.
+STATE_FILE = os.environ.get("SYNC_STATE_FILE", "sync_state.json")
+STATE_KEY = "pla_activity"
+
+# How far behind the high-water mark we re-check for missing days
+LOOKBACK_DAYS = int(os.environ.get("SYNC_LOOKBACK_DAYS", "14"))
+
+
+def link_id(link):
+    match = re.search(r'/plaact/(\d+)', link or '')
+    return int(match.group(1)) if match else None
+
+
+def _load_local():
+    try:
+        with open(STATE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _load_remote():
+    try:
+        resp = http_client.get(f"{supabase_api.rest_url('pla_sync_state')}?id=eq.{STATE_KEY}&select=publish_date,link_id",
+                               headers=supabase_api.HEADERS, timeout=10)
+        if resp.status_code == 200 and resp.json():
+            return resp.json()[0]
+    except Exception:
+        pass
+    # No state row yet: derive it from the newest activity row (one row, not the whole table)
+    try:
+        resp = http_client.get(f"{supabase_api.rest_url('pla_activity')}?select=publish_date,link&order=publish_date.desc&limit=1",
+                               headers=supabase_api.HEADERS, timeout=10)
+        if resp.status_code == 200 and resp.json():
+            row = resp.json()[0]
+            return {"publish_date": row['publish_date'], "link_id": link_id(row.get('link'))}
+    except Exception:
+        pass
+    return None
+
+
+def load():
+    """
+    Returns {"publish_date", "link_id"} or None when nothing has been synced yet.
+    The remote mark is the shared one; the local file is only a fallback when
+    Supabase can't be reached, as it may be stale on any given machine.
+    """
+    return _load_remote() or _load_local()
+
+
+def save(state):
+    with open(STATE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    try:
+        # Writes need the service_role key (SUPABASE_KEY); the anon key is rejected
+        resp = http_client.post(f"{supabase_api.rest_url('pla_sync_state')}?on_conflict=id", headers=supabase_api.UPSERT_HEADERS,
+                                json=[dict(state, id=STATE_KEY, updated_at=datetime.now(timezone.utc).isoformat())], timeout=10)
+        supabase_api.check_write(resp, "Sync state update", ok=(200, 201))
+    except PermissionError:
+        raise
+    except Exception as e:
+        print(f"Warning: could not store sync state remotely: {e}")
+
+
+def advance(state, records):
+    """Returns the high-water mark moved forward past the given uploaded records."""
+    best = dict(state or {"publish_date": None, "link_id": None})
+    for record in records:
+        candidate = (record.get('publish_date') or '', link_id(record.get('link')) or 0)
+        if candidate > (best['publish_date'] or '', best['link_id'] or 0):
+            best = {"publish_date": record.get('publish_date'), "link_id": link_id(record.get('link'))}
+    return best
+
+
+def window_start(state):
+    """First publish_date still checked for gaps, or None to scan the whole history."""
+    if not state or not state.get('publish_date'):
+        return None
+    hwm = datetime.strptime(state['publish_date'], '%Y-%m-%d')
+    return (hwm - timedelta(days=LOOKBACK_DAYS)).strftime('%Y-%m-%d')
+
+
+def known_dates_since(start):
+    """publish_dates already stored on or after `start` (a bounded query over the look-back window)."""
+    if not start:
+        return set()
+    resp = http_client.get(f"{supabase_api.rest_url('pla_activity')}?select=publish_date&publish_date=gte.{start}",
+                           headers=supabase_api.HEADERS, timeout=10)
+    resp.raise_for_status()
+    return {item['publish_date'] for item in resp.json() if item.get('publish_date')}
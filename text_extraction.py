@@ -0,0 +1,50 @@
+import re
+
+# Shared bulletin text extraction for update_pla_data.analyze_text_content and
+# analyze_pla_data.extract_numbers. Patterns are compiled once at import, and a
+# plain substring check skips each regex when its keyword is not in the text.
+
+COUNT_FIELDS = ("aircraft_total", "aircraft_crossing", "vessels_total", "official_ships_total", "balloons_total")
+
+# 偵獲共機 (Detect Communist Aircraft): "共機 1 架" or "共機1架次"
+AIRCRAFT_RE = re.compile(r'共機\s*(\d+)\s*(?:架|架次)')
+# Crossing count: first number of sorties inside the first parentheses, e.g. "(逾越中線...19架次)"
+PAREN_RE = re.compile(r'\((.*?)\)')
+CROSSING_RE = re.compile(r'(\d+)\s*(?:架|架次)')
+# 共艦 (Communist Vessels)
+VESSELS_RE = re.compile(r'共艦\s*(\d+)\s*(?:艘|艘次)')
+# 公務船 (Official Ships)
+OFFICIAL_RE = re.compile(r'公務船\s*(\d+)\s*(?:艘|艘次)')
+# 空飄氣球: "中共空飄氣球計偵獲1顆", "偵獲空飄氣球1枚"
+BALLOONS_RE = re.compile(r'空飄氣球.*?(\d+)[顆枚]')
+
+
+def extract_counts(text):
+    """Returns the five daily counts found in a bulletin's activity text (0 when absent)."""
+    data = dict.fromkeys(COUNT_FIELDS, 0)
+    if not text:
+        return data
+
+    if '共機' in text:
+        match = AIRCRAFT_RE.search(text)
+        if match: data["aircraft_total"] = int(match.group(1))
+
+    if '(' in text:
+        paren_match = PAREN_RE.search(text)
+        if paren_match:
+            crossing = CROSSING_RE.search(paren_match.group(1))
+            if crossing: data["aircraft_crossing"] = int(crossing.group(1))
+
+    if '共艦' in text:
+        match = VESSELS_RE.search(text)
+        if match: data["vessels_total"] = int(match.group(1))
+
+    if '公務船' in text:
+        match = OFFICIAL_RE.search(text)
+        if match: data["official_ships_total"] = int(match.group(1))
+
+    if '空飄氣球' in text:
+        match = BALLOONS_RE.search(text)
+        if match: data["balloons_total"] = int(match.group(1))
+
+    return data